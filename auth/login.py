@@ -11,7 +11,7 @@ from auth.security import (
     validate_password_strength
 )
 # IMPORTOVÁNO create_reset_request z database.py
-from data.database import load_all_data, get_worksheets_resources, update_user_password, create_reset_request
+from data.database import load_dataset, update_user_password, register_user, create_reset_request
 from utils.config import MAX_PLAYERS
 
 
@@ -21,8 +21,7 @@ def render_login_page():
     DESIGN UPDATE: Centrovaný úzký layout (Card UI).
     """
     # Načtení dat
-    _, _, users, _, _ = load_all_data()
-    ws_zapasy, ws_tipy, ws_users, ws_nastaveni, ws_chat = get_worksheets_resources()
+    users = load_dataset("users")
 
     pocet_hracu = len(users)
     st.markdown(f"<div style='text-align: center; color: #64748b; margin-bottom: 20px;'>Do hry je zapojeno již <b>{pocet_hracu}</b> hráčů!</div>", unsafe_allow_html=True)
@@ -84,7 +83,7 @@ def render_login_page():
                         old_hash = user_match.get('Heslo', '')
                         if len(old_hash) == 64 and not old_hash.startswith('$'):
                             new_hash = hash_password(password)
-                            update_user_password(ws_users, user_idx, new_hash)
+                            update_user_password(user_idx, new_hash)
                         
                         record_successful_login()
                         st.session_state.update({
@@ -189,8 +188,7 @@ def render_login_page():
                         new_id       # ID
                     ]
                     
-                    ws_users.append_row(row)
-                    st.cache_data.clear()
+                    register_user(row)
                     
                     st.success("Registrace úspěšná! Nyní se můžete přihlásit.")
                     st.balloons()
@@ -3,9 +3,73 @@ Business logika - výpočet bodů
 ZACHOVÁNO: Přesná logika z tipovacka_12.py
 """
 
-import math
 from datetime import datetime
-from utils.config import TIMEZONE
+from functools import lru_cache
+
+import numpy as np
+
+from data.store import match_flags
+from utils.config import TIMEZONE, POINTS_CONFIG, MAX_SCORE_VALUE
+from utils.dates import parse_date
+
+
+@lru_cache(maxsize=1024)
+def _modifiers(faze, team_d, team_h) -> tuple:
+    """Modifikátory zápasu (is_playoff, has_czech) pro jednotlivý zápas, viz data/store.match_flags."""
+    is_playoff, _, has_czech = match_flags(faze, team_d, team_h)
+    return is_playoff, has_czech
+
+
+def _winner_ok(td, th, rd, rh):
+    """Gatekeeper: tipnutý vítěz = skutečný vítěz (1 = domácí, 2 = hosté, remíza v tipu nesedí nikdy)."""
+    winner_real = np.where(rd > rh, 1, 2)
+    winner_tip = np.where(td > th, 1, np.where(th > td, 2, 0))
+    return winner_real == winner_tip
+
+
+def _base_points(td, th, rd, rh, is_playoff, has_czech, cfg=POINTS_CONFIG):
+    """
+    Body bez prodloužení podle pravidel cfg (výchozí POINTS_CONFIG, 0 = špatný vítěz).
+    Funguje pro čísla i pro NumPy pole (pak po prvcích).
+    """
+    # Body podle přesnosti (rozdíl v gólech) + bonus za přesný tip
+    diff = np.abs(rd - td) + np.abs(rh - th)
+    exact = (td == rd) & (th == rh)
+    base = np.maximum(cfg['min_winner_points'], cfg['max_base_points'] - diff) + cfg['exact_match_bonus'] * exact
+    # Playoff násobič (zaokrouhlení nahoru), bonus za české týmy
+    base = np.where(is_playoff, np.ceil(base * cfg['playoff_multiplier']), base)
+    base = base + cfg['czech_team_bonus'] * (np.asarray(has_czech) & (base > 0))
+    return np.where(_winner_ok(td, th, rd, rh), base, 0).astype(np.int16)
+
+
+# Pravidla, ze kterých se staví tabulka základních bodů (ostatní pravidla ji neovlivní)
+TABLE_RULES = ("max_base_points", "min_winner_points", "exact_match_bonus", "playoff_multiplier", "czech_team_bonus")
+# Pravidla, která musí být celá čísla - tabulka drží body jako int16 (násobič se zaokrouhluje nahoru)
+INTEGER_RULES = ("max_base_points", "min_winner_points", "exact_match_bonus", "czech_team_bonus")
+
+
+@lru_cache(maxsize=8)
+def _scoring_table(table_rules: tuple):
+    n = MAX_SCORE_VALUE + 1
+    playoff, czech, td, th, rd, rh = np.indices((2, 2, n, n, n, n), dtype=np.int16)
+    return _base_points(td, th, rd, rh, playoff.astype(bool), czech.astype(bool), dict(zip(TABLE_RULES, table_rules)))
+
+
+def scoring_table(config=None):
+    """
+    Předpočítané body bez prodloužení pro všechna skóre 0..MAX_SCORE_VALUE:
+    table[is_playoff, has_czech, tip_d, tip_h, real_d, real_h] (int16).
+    Tabulka se staví jednou pro každou kombinaci TABLE_RULES (config, výchozí POINTS_CONFIG).
+    """
+    cfg = config or POINTS_CONFIG
+    for key in INTEGER_RULES:
+        if float(cfg[key]) != int(cfg[key]):
+            raise ValueError(f"{key} musí být celé číslo (je {cfg[key]})")
+    return _scoring_table(tuple(cfg[key] for key in TABLE_RULES))
+
+
+def _in_table(*values) -> bool:
+    return all(0 <= v <= MAX_SCORE_VALUE for v in values)
 
 
 def spocitej_body_zapas(tip_d, tip_h, real_d, real_h, team_d, team_h, faze, tip_ot='', real_ot=''):
@@ -27,61 +91,171 @@ def spocitej_body_zapas(tip_d, tip_h, real_d, real_h, team_d, team_h, faze, tip_
     except (ValueError, TypeError):
         return 0, False, False, 0
     
-    # 1. URČENÍ VÍTĚZE (1 = domácí, 2 = hosté)
-    winner_real = 1 if rd > rh else 2
-    winner_tip = 1 if td > th else (2 if th > td else 0)
-    
-    # --- GATEKEEPER: KONTROLA VÍTĚZE ---
     # Pokud se vítěz neshoduje, okamžitě končíme. Žádné body, žádné bonusy.
-    if winner_real != winner_tip:
+    if not _winner_ok(td, th, rd, rh):
         return 0, False, False, 0
 
-    # Pokud jsme tady, vítěz je SPRÁVNĚ. Jdeme počítat body.
-    base_points = 0
+    # Základní body, přesný tip, playoff a české týmy - z předpočítané tabulky
+    is_playoff, has_czech = _modifiers(faze, team_d, team_h)
+    if _in_table(td, th, rd, rh):
+        base_points = int(scoring_table()[int(is_playoff), int(has_czech), td, th, rd, rh])
+    else:
+        base_points = int(_base_points(td, th, rd, rh, is_playoff, has_czech))
+    is_exact = td == rd and th == rh
+    
+    # Bonus/penalizace za prodloužení - jen když byl tipnut rozdíl o 1 gól (podmínka pro možnost OT)
     ot_points = 0
-    is_exact = False
+    if abs(td - th) == 1 and str(tip_ot).strip().upper() == "ANO":
+        real_ot_bool = str(real_ot).strip().upper() == "ANO"
+        ot_points = POINTS_CONFIG['overtime_correct'] if real_ot_bool else POINTS_CONFIG['overtime_wrong']
+    
+    # Celkem (nemůže být záporné)
+    total_points = max(0, base_points + ot_points)
+    scored = (total_points > 0 or ot_points != 0)
+    
+    return total_points, is_exact, scored, ot_points
+
+
+def spocitej_body_batch(tip_d, tip_h, real_d, real_h, is_playoff, has_czech, tip_ot, real_ot, config=None):
+    """
+    Hromadná verze spocitej_body_zapas nad zarovnanými poli (jeden prvek = jeden tip).
+    Chybějící tip nebo výsledek je záporné číslo (NO_VALUE), takový tip má 0 bodů.
     
-    # 2. VÝPOČET ZÁKLADNÍCH BODŮ (Rozdíl skóre)
-    # Spočítáme rozdíl v gólech
-    diff = abs(rd - td) + abs(rh - th)
+    Args:
+        tip_d, tip_h, real_d, real_h: celočíselná pole
+        is_playoff, has_czech: bool pole - modifikátory zápasu (viz match_modifiers)
+        tip_ot, real_ot: bool pole - tip na prodloužení / zápas skončil v prodloužení
+        config: pravidla bodování (výchozí POINTS_CONFIG)
     
-    # Body podle přesnosti (max 7, min 2)
-    base_points = max(2, 7 - diff)
+    Returns:
+        (points, is_exact, scored, ot_points) - pole stejné délky, hodnoty jako u skalární funkce
+    """
+    cfg = config or POINTS_CONFIG
+    td, th = np.asarray(tip_d, dtype=np.int32), np.asarray(tip_h, dtype=np.int32)
+    rd, rh = np.asarray(real_d, dtype=np.int32), np.asarray(real_h, dtype=np.int32)
+    is_playoff, has_czech = np.asarray(is_playoff, dtype=bool), np.asarray(has_czech, dtype=bool)
+    valid = (td >= 0) & (th >= 0) & (rd >= 0) & (rh >= 0)
+    ok = valid & _winner_ok(td, th, rd, rh)
     
-    # Bonus za přesný tip
-    if td == rd and th == rh:
-        base_points += 2
-        is_exact = True
+    # Základní body = index do tabulky, skóre nad MAX_SCORE_VALUE se dopočítají vzorcem
+    in_table = valid & (td <= MAX_SCORE_VALUE) & (th <= MAX_SCORE_VALUE) & (rd <= MAX_SCORE_VALUE) & (rh <= MAX_SCORE_VALUE)
+    idx = [np.where(in_table, v, 0) for v in (td, th, rd, rh)]
+    base = scoring_table(cfg)[is_playoff.astype(np.intp), has_czech.astype(np.intp), idx[0], idx[1], idx[2], idx[3]]
+    outside = ok & ~in_table
+    if outside.any():
+        base = np.where(outside, _base_points(td, th, rd, rh, is_playoff, has_czech, cfg), base)
     
-    # 3. PLAYOFF MULTIPLIKÁTOR
-    faze_lower = str(faze).lower()
-    is_playoff = any(x in faze_lower for x in ["playoff", "finále", "o 3.", "čtvrt", "semi"])
+    is_exact = ok & (td == rd) & (th == rh)
+    tip_ot_on = ok & (np.abs(td - th) == 1) & np.asarray(tip_ot, dtype=bool)
+    ot_points = np.where(
+        tip_ot_on,
+        np.where(real_ot, cfg['overtime_correct'], cfg['overtime_wrong']),
+        0
+    )
     
-    if is_playoff:
-        base_points = math.ceil(base_points * 1.5)
+    points = np.where(ok, np.maximum(0, base + ot_points), 0)
+    scored = ok & ((points > 0) | (ot_points != 0))
+    return points, is_exact, scored, ot_points
+
+
+def match_modifiers(zapasy) -> tuple:
+    """Modifikátory zápasů pro spocitej_body_batch: (is_playoff, has_czech) - sloupce MatchTable."""
+    return zapasy.is_playoff, zapasy.has_czech
+
+
+class TipScores:
+    """
+    Body všech tipů proti odehraným zápasům, spočítané jedním průchodem (score_tips).
+    Pole jsou zarovnaná s řádky TipTable, tipy na neodehrané zápasy mají 0.
+    Body podle pravidel config (výchozí POINTS_CONFIG).
     
-    # 4. BONUS ZA ČESKÉ TÝMY
-    match_teams = (str(team_d) + " " + str(team_h)).lower()
-    if ("česko" in match_teams or "czech" in match_teams) and base_points > 0:
-        base_points += 2
+    Atributy:
+        match_pos: pozice zápasu v zapasy (-1 = zápas neexistuje)
+        finished: tip patří k odehranému zápasu
+        points, is_exact, scored, ot_points: výsledek spocitej_body_batch
+        days: seřazené dny výkopů, match_day: index dne u každého zápasu (-1 = bez data)
+        day_matches: pozice zápasů po dnech, day_finished: všechny zápasy dne mají výsledek
+        daily_points: body hráčů po dnech (řádek = kód emailu, sloupec = index dne)
+    """
     
-    # 5. BONUS/PENALIZACE ZA PRODLOUŽENÍ
-    # Počítáme jen pokud byl tipnut rozdíl o 1 gól (podmínka pro možnost OT)
-    if abs(td - th) == 1:
-        tip_ot_bool = str(tip_ot).strip().upper() == "ANO"
-        real_ot_bool = str(real_ot).strip().upper() == "ANO"
+    def __init__(self, zapasy, tipy, config=None):
+        self.emails = tipy.emails
+        self.email_codes = tipy.email_codes
+        self.match_ids = tipy.match_ids
+        self.match_codes = tipy.match_codes
+        self.n_matches = len(zapasy)
+        
+        pos_of_code = np.array([zapasy.position.get(zid, -1) for zid in tipy.match_ids], dtype=np.int64)
+        self.match_pos = pos_of_code[tipy.match_codes]
+        
+        def at_match(column, missing):
+            # Hodnota zápasu u každého tipu, pozice -1 ukáže na doplněnou hodnotu missing
+            return np.append(column, missing)[self.match_pos]
+        
+        is_playoff, has_czech = match_modifiers(zapasy)
+        self.finished = at_match(zapasy.is_finished, False)
+        self.points, self.is_exact, self.scored, self.ot_points = spocitej_body_batch(
+            tipy.home, tipy.away,
+            at_match(zapasy.score_home, -1), at_match(zapasy.score_away, -1),
+            at_match(is_playoff, False), at_match(has_czech, False),
+            tipy.overtime, at_match(zapasy.overtime, False), config
+        )
         
-        if tip_ot_bool:
-            if real_ot_bool:
-                ot_points = 1  # Trefil jsi, že bude OT
-            else:
-                ot_points = -1 # Myslel sis OT, ale nebylo
+        # Index dnů (rozpis MatchTable) a body hráčů po dnech - jedna agregace pro tiper dne i denní žebříčky
+        self.days, self.match_day, self.day_matches = zapasy.days, zapasy.match_day, zapasy.day_matches
+        self.day_finished = np.array([bool(zapasy.is_finished[m].all()) for m in self.day_matches], dtype=bool)
+        
+        n_days = len(self.days)
+        tip_day = at_match(self.match_day, -1)
+        dated = tip_day >= 0
+        self.daily_points = np.bincount(
+            self.email_codes[dated] * n_days + tip_day[dated], weights=self.points[dated],
+            minlength=len(self.emails) * n_days
+        ).astype(np.int64).reshape(len(self.emails), n_days)
+        self._rows = None
     
-    # Celkem (nemůže být záporné)
-    total_points = max(0, base_points + ot_points)
-    scored = (total_points > 0 or ot_points != 0)
+    def per_user(self, values, mask=None) -> dict:
+        """Součet hodnot (body, trefy...) po hráčích: {email: int}."""
+        codes = self.email_codes
+        values = np.asarray(values)
+        if mask is not None:
+            codes, values = codes[mask], values[mask]
+        sums = np.bincount(codes, weights=values, minlength=len(self.emails))
+        return {email: int(total) for email, total in zip(self.emails, sums)}
     
-    return total_points, is_exact, scored, ot_points
+    def per_match(self, values, mask=None) -> tuple:
+        """Součet hodnot a počet tipů po zápasech: (součty, počty) - pole indexovaná pozicí zápasu."""
+        known = self.match_pos >= 0 if mask is None else (self.match_pos >= 0) & mask
+        pos = self.match_pos[known]
+        return (
+            np.bincount(pos, weights=np.asarray(values)[known], minlength=self.n_matches),
+            np.bincount(pos, minlength=self.n_matches),
+        )
+    
+    def day_points(self, day) -> dict:
+        """Body hráčů za jeden den (denní žebříček): {email: int}."""
+        code = self.days.index(day)
+        return {email: int(p) for email, p in zip(self.emails, self.daily_points[:, code])}
+    
+    def get(self, email, match_id) -> tuple:
+        """Výsledek jednoho tipu (points, is_exact, scored, ot_points), bez tipu nuly."""
+        if self._rows is None:
+            self._rows = {
+                (self.emails[e], self.match_ids[m]): i
+                for i, (e, m) in enumerate(zip(self.email_codes.tolist(), self.match_codes.tolist()))
+            }
+        i = self._rows.get((str(email), str(match_id)))
+        if i is None:
+            return 0, False, False, 0
+        return int(self.points[i]), bool(self.is_exact[i]), bool(self.scored[i]), int(self.ot_points[i])
+
+
+def score_tips(zapasy, tipy, config=None) -> TipScores:
+    """
+    Spočítá body všech tipů jedním průchodem (MatchTable x TipTable, viz data/store.py).
+    Všechny souhrny v UI (žebříček, tiper dne, trendy, přehled, statistiky) se berou odsud.
+    """
+    return TipScores(zapasy, tipy, config)
 
 
 def get_all_teams(zapasy):
@@ -108,24 +282,14 @@ def is_past_deadline(deadline_str):
     Kontroluje, zda už uplynula uzávěrka.
     PŮVODNÍ FUNKCE z tipovacka_12.py
     """
-    if not deadline_str:
+    # Uzávěrka se parsuje jen jednou (parse_date si výsledek pamatuje)
+    d = parse_date(deadline_str)
+    if d is None:
         return False
-    
-    try:
-        for fmt in ("%Y-%m-%d %H:%M", "%d.%m.%Y %H:%M"):
-            try:
-                d = datetime.strptime(str(deadline_str), fmt)
-                d = TIMEZONE.localize(d)
-                return datetime.now(TIMEZONE) > d
-            except ValueError:
-                continue
-    except:
-        pass
-    
-    return False
+    return datetime.now(TIMEZONE) > d
 
 
-def spocitej_dlouhodobe_body(user_row, official_results):
+def spocitej_dlouhodobe_body(user_row, official_results, config=None):
     """
     Spočítá body z dlouhodobých sázek (vítěz + medaile).
     PŮVODNÍ FUNKCE z tipovacka_12.py
@@ -133,15 +297,17 @@ def spocitej_dlouhodobe_body(user_row, official_results):
     Args:
         user_row: Řádek uživatele z users
         official_results: {'winner': str, 'medals': [str, str, str]}
+        config: pravidla bodování (výchozí POINTS_CONFIG)
         
     Returns:
         int: Celkové body za dlouhodobé tipy
     """
+    cfg = config or POINTS_CONFIG
     points = 0
     
     # Vítěz turnaje (+15 bodů)
     if official_results.get('winner') and str(user_row.get('Tip_Vitez')) == official_results['winner']:
-        points += 15
+        points += cfg['winner_points']
     
     # Medaile (+4 body za každou)
     real_medals = [m for m in official_results.get('medals', []) if m]
@@ -153,6 +319,6 @@ def spocitej_dlouhodobe_body(user_row, official_results):
     
     # Unikátní zásahy (pokud tip uživatele je v reálných medailích)
     unique_hits = set([t for t in user_medals if t and t in real_medals])
-    points += len(unique_hits) * 4
+    points += len(unique_hits) * cfg['medal_points']
     
     return points
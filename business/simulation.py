@@ -0,0 +1,353 @@
+"""
+Business logika - simulace
+Co kdyby: přepočet celého turnaje podle jiných pravidel (POINTS_CONFIG)
+a porovnání žebříčků vedle sebe.
+
+Projekce: Monte Carlo simulace zbývajících zápasů a medailí (výsledky se losují
+z tipů davu), hromadné přebodování všech hráčů a pravděpodobnost každého
+konečného pořadí. Simulace běží na pozadí v procesech (ProjectionRunner).
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from business.scoring import spocitej_body_batch, match_modifiers, get_all_teams, INTEGER_RULES
+from business.standings import compute_standings
+from utils.config import POINTS_CONFIG
+
+# Výsledky pro zápas, na který nikdo netipoval a ještě se nic neodehrálo (domácí, hosté, prodloužení)
+FALLBACK_RESULTS = [(3, 2, False), (2, 1, False), (4, 1, False), (3, 2, True),
+                    (2, 3, False), (1, 2, False), (1, 4, False), (2, 3, True)]
+
+
+def rule_value(param: str, value):
+    """
+    Hodnota pravidla z editoru / textu: celé číslo zůstane int, desetinné jen u pravidel,
+    která ho unesou (INTEGER_RULES drží tabulka bodů jako celá čísla - ValueError).
+    """
+    number = float(value)
+    if number.is_integer():
+        return int(number)
+    if param in INTEGER_RULES:
+        raise ValueError(f"{param} musí být celé číslo (ne {value})")
+    return number
+
+
+def rule_variants(base: dict, param: str, values: list) -> list:
+    """Sada pravidel pro každou hodnotu jednoho parametru: [("param=hodnota", pravidla)]."""
+    return [(f"{param}={v}", dict(base, **{param: v})) for v in values]
+
+
+def compare_rules(zapasy, tipy, users, rule_sets, official_results=None) -> pd.DataFrame:
+    """
+    Přepočítá žebříček pro každou sadu pravidel a vrátí je vedle sebe.
+
+    Args:
+        rule_sets: {název: pravidla} nebo [(název, pravidla)] - chybějící klíče se doplní
+                   z POINTS_CONFIG, stejný název dvakrát je chyba (ValueError)
+
+    Returns:
+        Tabulka po hráčích (seřazená podle první sady): Hráč + pro každou sadu
+        "<název>: Body" a "<název>: Pořadí"
+    """
+    rule_sets = list(rule_sets.items()) if isinstance(rule_sets, dict) else list(rule_sets)
+    names = [name for name, _ in rule_sets]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"sady pravidel se stejným názvem: {', '.join(duplicates)}")
+
+    table = pd.DataFrame({
+        "Email": [str(u['Email']) for u in users],
+        "Hráč": [u['Jmeno'] for u in users],
+    }).set_index("Email")
+
+    for name, rules in rule_sets:
+        result = compute_standings(zapasy, tipy, users, dict(POINTS_CONFIG, **rules), official_results)
+        ranked = result.df_rank.set_index("Email")
+        table[f"{name}: Body"] = ranked["Celkem"]
+        table[f"{name}: Pořadí"] = ranked["Pořadí"]
+
+    if rule_sets:
+        first = names[0]
+        table = table.sort_values([f"{first}: Pořadí", "Hráč"])
+    return table.reset_index(drop=True)
+
+
+def results_key(zapasy, official_results) -> tuple:
+    """Otisk zadaných výsledků - projekce platí, dokud se nezadá další výsledek."""
+    return (
+        tuple((z['ID'], z['Skore_Domaci'], z['Skore_Hoste'], str(z.get('Prodlouzeni', ''))) for z in zapasy if z['is_finished']),
+        official_results.get('winner'), tuple(official_results.get('medals', [])),
+    )
+
+
+def build_projection(zapasy, tipy, users, standings, official_results, config=None) -> dict:
+    """
+    Připraví zadání simulace (jen NumPy pole a čísla, aby šlo poslat do procesu).
+
+    Args:
+        standings: aktuální Standings (compute_standings) - body z odehraných zápasů a bonusy
+    """
+    cfg = config or POINTS_CONFIG
+    emails = [str(u['Email']) for u in users]
+    user_of = {e: i for i, e in enumerate(emails)}
+    n_users = len(emails)
+    scores = standings.scores
+
+    # Zbývající zápasy a jejich sloupec (tipy na odehrané / neznámé zápasy mají -1)
+    remaining = np.flatnonzero(~zapasy.is_finished)
+    n_rem = len(remaining)
+    col_of = np.full(len(zapasy) + 1, -1, dtype=np.int64)
+    col_of[remaining] = np.arange(n_rem)
+    tip_col = col_of[scores.match_pos]
+    tip_user = np.array([user_of.get(e, -1) for e in tipy.emails], dtype=np.int64)[tipy.email_codes]
+
+    # Tipy hráčů (hráč x zbývající zápas), -1 = bez tipu
+    mine = (tip_user >= 0) & (tip_col >= 0)
+    tip_home = np.full((n_users, n_rem), -1, dtype=np.int16)
+    tip_away = np.full((n_users, n_rem), -1, dtype=np.int16)
+    tip_ot = np.zeros((n_users, n_rem), dtype=bool)
+    tip_home[tip_user[mine], tip_col[mine]] = tipy.home[mine]
+    tip_away[tip_user[mine], tip_col[mine]] = tipy.away[mine]
+    tip_ot[tip_user[mine], tip_col[mine]] = tipy.overtime[mine]
+
+    # Dav: počet tipů a tipy na výhru domácích / hostů (stejně jako bonus za odvahu)
+    on_rem = tip_col >= 0
+    crowd_total = np.bincount(tip_col[on_rem], minlength=n_rem)
+    crowd_home = np.bincount(tip_col[on_rem & (tipy.home > tipy.away)], minlength=n_rem)
+    crowd_away = np.bincount(tip_col[on_rem & (tipy.away > tipy.home)], minlength=n_rem)
+
+    # Možné výsledky zápasu = tipy davu bez remíz (losuje se rovnoměrně z nich)
+    valid = on_rem & (tipy.home >= 0) & (tipy.away >= 0) & (tipy.home != tipy.away)
+    order = np.argsort(tip_col[valid], kind='stable')
+    cand_home = tipy.home[valid][order].astype(np.int16)
+    cand_away = tipy.away[valid][order].astype(np.int16)
+    cand_ot = (tipy.overtime[valid] & (np.abs(tipy.home[valid].astype(int) - tipy.away[valid]) == 1))[order]
+    cand_count = np.bincount(tip_col[valid], minlength=n_rem)
+    cand_start = np.cumsum(cand_count) - cand_count
+
+    # Zápasy bez tipů: odehrané výsledky turnaje, jinak FALLBACK_RESULTS
+    if (cand_count == 0).any():
+        played = [(z['Skore_Domaci'], z['Skore_Hoste'], str(z.get('Prodlouzeni', '')).upper() == "ANO")
+                  for z in standings.finished_matches if z['Skore_Domaci'] != z['Skore_Hoste']]
+        pool = np.array(played or FALLBACK_RESULTS, dtype=np.int16).reshape(-1, 3)
+        empty = cand_count == 0
+        cand_start[empty], cand_count[empty] = len(cand_home), len(pool)
+        cand_home = np.concatenate([cand_home, pool[:, 0]])
+        cand_away = np.concatenate([cand_away, pool[:, 1]])
+        cand_ot = np.concatenate([cand_ot, pool[:, 2].astype(bool)])
+
+    # Tiper dne: dny se zbývajícími zápasy, body už odehraných zápasů těchto dnů
+    rem_day = scores.match_day[remaining]
+    days = np.unique(rem_day[rem_day >= 0])
+    day_onehot = (rem_day[:, None] == days[None, :]).astype(np.float64)
+    day_base = np.zeros((n_users, len(days)))
+    for code, email in enumerate(scores.emails):
+        if email in user_of:
+            day_base[user_of[email]] = scores.daily_points[code, days]
+    day_bonus = np.array([cfg['tiper_dne_per_match'] * len(scores.day_matches[d]) for d in days], dtype=np.float64)
+
+    # Body, které už nikdo nevezme (zápasy, odvaha, tiper dne; medaile jen když jsou známé)
+    medals_known = bool(official_results.get('winner'))
+    base = np.array([
+        standings.match_points[e] + standings.bonus_odvaha[e] + standings.bonus_tiper_dne[e]
+        + (standings.long_term_points[e] if medals_known else 0)
+        for e in emails
+    ], dtype=np.float64)
+
+    # Medaile: vítěz a medailisté se losují podle tipů hráčů (+1, aby měl šanci každý tým)
+    teams = get_all_teams(zapasy)
+    team_of = {t: i for i, t in enumerate(teams)}
+    win_tip = np.array([team_of.get(str(u.get('Tip_Vitez')), -1) for u in users], dtype=np.int64)
+    med_tip = np.full((n_users, 3), -1, dtype=np.int64)
+    for i, u in enumerate(users):
+        picked = list(dict.fromkeys(team_of.get(str(u.get(c)), -1) for c in ('Tip_Med1', 'Tip_Med2', 'Tip_Med3')))
+        med_tip[i, :len(picked)] = picked
+    winner_weight = 1 + np.bincount(win_tip[win_tip >= 0], minlength=len(teams))
+    medal_weight = 1 + np.bincount(med_tip[med_tip >= 0], minlength=len(teams))
+
+    is_playoff, has_czech = match_modifiers(zapasy)
+    return {
+        "emails": emails, "names": [u['Jmeno'] for u in users], "config": dict(cfg),
+        "n_matches": len(zapasy),
+        "tip_home": tip_home, "tip_away": tip_away, "tip_ot": tip_ot,
+        "is_playoff": is_playoff[remaining], "has_czech": has_czech[remaining],
+        "crowd_total": crowd_total, "crowd_home": crowd_home, "crowd_away": crowd_away,
+        "cand_home": cand_home, "cand_away": cand_away, "cand_ot": cand_ot,
+        "cand_start": cand_start, "cand_count": cand_count,
+        "day_onehot": day_onehot, "day_base": day_base, "day_bonus": day_bonus,
+        "base": base, "exact": np.array([standings.exact_matches[e] for e in emails], dtype=np.int64),
+        "sample_medals": not medals_known and len(teams) > 0,
+        "win_tip": win_tip, "med_tip": med_tip,
+        "winner_weight": winner_weight.astype(np.float64), "medal_weight": medal_weight.astype(np.float64),
+    }
+
+
+def simulate_projection(problem: dict, n_sims: int, seed) -> np.ndarray:
+    """
+    Odsimuluje zbytek turnaje n_sims-krát (vše jako pole simulace x hráč x zápas).
+
+    Returns:
+        Matice počtů (hráč x konečné pořadí - 1)
+    """
+    rng = np.random.default_rng(seed)
+    cfg = problem["config"]
+    n_users, n_rem = problem["tip_home"].shape
+    totals = np.repeat(problem["base"][None, :], n_sims, axis=0)
+    exact = np.repeat(problem["exact"][None, :], n_sims, axis=0)
+
+    if n_rem:
+        # Výsledky zbývajících zápasů (simulace x zápas)
+        pick = problem["cand_start"] + (rng.random((n_sims, n_rem)) * problem["cand_count"]).astype(np.int64)
+        real_home, real_away, real_ot = problem["cand_home"][pick], problem["cand_away"][pick], problem["cand_ot"][pick]
+
+        shape = (n_sims, n_users, n_rem)
+        tip_home, tip_away = problem["tip_home"][None], problem["tip_away"][None]
+        points, is_exact, _, _ = spocitej_body_batch(
+            np.broadcast_to(tip_home, shape), np.broadcast_to(tip_away, shape),
+            np.broadcast_to(real_home[:, None, :], shape), np.broadcast_to(real_away[:, None, :], shape),
+            np.broadcast_to(problem["is_playoff"], shape), np.broadcast_to(problem["has_czech"], shape),
+            np.broadcast_to(problem["tip_ot"][None], shape), np.broadcast_to(real_ot[:, None, :], shape),
+            cfg
+        )
+        totals += points.sum(axis=2)
+        exact += is_exact.sum(axis=2)
+
+        # Odvaha: vítěze tipovalo méně než underdog_threshold tipujících
+        home_won = real_home > real_away
+        share = np.where(home_won, problem["crowd_home"], problem["crowd_away"]) / np.maximum(problem["crowd_total"], 1)
+        underdog = (problem["crowd_total"] > 0) & (share < cfg['underdog_threshold'])
+        picked = np.where(home_won[:, None, :], tip_home > tip_away, tip_away > tip_home)
+        totals += cfg['underdog_bonus'] * (picked & underdog[:, None, :]).sum(axis=2)
+
+        # Tiper dne pro dny se zbývajícími zápasy
+        if problem["day_bonus"].size:
+            day_points = problem["day_base"][None] + points @ problem["day_onehot"]
+            best = day_points.max(axis=1, keepdims=True)
+            totals += (((day_points == best) & (best > 0)) * problem["day_bonus"]).sum(axis=2)
+
+    # Vítěz a medailisté (Gumbel-max = losování bez vracení podle vah)
+    if problem["sample_medals"]:
+        n_teams = len(problem["winner_weight"])
+        winner = np.argmax(np.log(problem["winner_weight"]) + rng.gumbel(size=(n_sims, n_teams)), axis=1)
+        keys = np.log(problem["medal_weight"]) + rng.gumbel(size=(n_sims, n_teams))
+        keys[np.arange(n_sims), winner] = -np.inf
+        others = np.argsort(-keys, axis=1)[:, :min(2, n_teams - 1)]
+        medals = np.column_stack([winner, others])
+        totals += cfg['winner_points'] * (problem["win_tip"][None, :] == winner[:, None])
+        hits = (problem["med_tip"][None, :, :, None] == medals[:, None, None, :]).any(axis=3) & (problem["med_tip"][None] >= 0)
+        totals += cfg['medal_points'] * hits.sum(axis=2)
+
+    # Ostrostřelci na konci turnaje
+    if problem["n_matches"]:
+        best = exact.max(axis=1, keepdims=True)
+        totals += cfg['sharpshooter_bonus'] * ((exact == best) & (best > 0))
+
+    # Pořadí jako v žebříčku: 1 + počet hráčů s více body
+    ranks = 1 + (totals[:, None, :] > totals[:, :, None]).sum(axis=2)
+    cells = np.arange(n_users)[None, :] * n_users + ranks - 1
+    return np.bincount(cells.ravel(), minlength=n_users * n_users).reshape(n_users, n_users)
+
+
+def podium_table(problem: dict, counts: np.ndarray) -> pd.DataFrame:
+    """Pravděpodobnosti konečného pořadí: Hráč, 1./2./3. místo, Na bedně (seřazeno podle bedny)."""
+    n_users = len(problem["emails"])
+    probs = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    top = np.zeros((n_users, 3))
+    top[:, :min(3, n_users)] = probs[:, :3]
+    table = pd.DataFrame({
+        "Email": problem["emails"], "Hráč": problem["names"],
+        "1. místo": top[:, 0], "2. místo": top[:, 1], "3. místo": top[:, 2],
+        "Na bedně": top.sum(axis=1),
+    })
+    return table.sort_values(["Na bedně", "1. místo"], ascending=False).reset_index(drop=True)
+
+
+class ProjectionRunner:
+    """
+    Projekce na pozadí: zadání se připraví ve vlákně, simulace se rozdělí do dávek
+    pro ProcessPoolExecutor (všechna jádra). Překreslení stránky na nic nečeká.
+    Výsledek se drží, dokud se nezmění klíč (results_key - další zadaný výsledek).
+    """
+
+    def __init__(self, workers=None):
+        self.lock = threading.Lock()
+        self._workers = workers
+        self._executor = None
+        self._key = None        # klíč, ke kterému patří _problem, _futures a _result
+        self._building = None   # klíč, pro který se právě připravuje zadání
+        self._error = None      # (klíč, chyba) z přípravy zadání
+        self._problem = None
+        self._futures = []
+        self._result = None
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn: proces serveru má vlákna, fork by je zdědil v nedefinovaném stavu
+            self._executor = ProcessPoolExecutor(max_workers=self._workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _drop_pool(self):
+        """Ukončí pool i s procesy (příště se založí nový, kdyby některý proces spadl)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _start(self, key, build, n_sims: int, chunk: int):
+        """Vlákno: připraví zadání a spustí dávky. Klíč se přepne až po úspěchu."""
+        try:
+            problem = build()
+        except Exception as e:
+            with self.lock:
+                if self._building == key:
+                    self._building, self._error = None, (key, e)
+            return
+
+        with self.lock:
+            if self._building != key:
+                return  # mezitím přišel novější klíč
+            self._building = None
+            sizes = [min(chunk, n_sims - start) for start in range(0, n_sims, chunk)]
+            seeds = np.random.SeedSequence().spawn(len(sizes))
+            try:
+                pool = self._pool()
+                futures = [pool.submit(simulate_projection, problem, n, seed) for n, seed in zip(sizes, seeds)]
+            except Exception as e:
+                self._drop_pool()
+                self._error = (key, e)
+                return
+            for future in self._futures:
+                future.cancel()
+            self._key, self._problem, self._futures, self._result = key, problem, futures, None
+
+    def get(self, key, build, n_sims: int, chunk: int):
+        """
+        Vrátí tabulku podium_table pro klíč, nebo None, dokud se zadání připravuje nebo simulace běží.
+        Při novém klíči připraví zadání (build) ve vlákně a spustí nové dávky, rozpracované zruší.
+        Chyba přípravy nebo simulace se vyhodí jednou, další volání to zkusí znovu.
+        """
+        with self.lock:
+            if self._error is not None and self._error[0] == key:
+                error, self._error = self._error[1], None
+                raise error
+            if key != self._key:
+                if key != self._building:
+                    self._building, self._error = key, None
+                    threading.Thread(
+                        target=self._start, args=(key, build, n_sims, chunk), name="projection-build", daemon=True
+                    ).start()
+                return None
+
+            if self._result is None and all(f.done() for f in self._futures):
+                try:
+                    counts = sum(f.result() for f in self._futures)
+                except Exception:
+                    self._key, self._futures = None, []
+                    self._drop_pool()
+                    raise
+                self._result = podium_table(self._problem, counts)
+            return self._result
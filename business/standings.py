@@ -0,0 +1,431 @@
+"""
+Business logika - žebříček
+compute_standings spočítá z dat celý žebříček (body za zápasy, odvaha, tiper dne,
+ostrostřelci, medaile, pořadí a vývoj) a vrátí neměnný výsledek Standings.
+
+Všechno se skládá z hromadného průchodu score_tips (pole po tipech, součty přes bincount),
+takže přepočet celé verze dat je levný. StandingsCache ho dělá jednou na verzi dat.
+"""
+
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from business.scoring import score_tips, spocitej_dlouhodobe_body, spocitej_body_batch, match_modifiers
+from utils.config import POINTS_CONFIG, OFFICIAL_RESULTS
+
+
+def _match_day(z):
+    return z['Datum_Obj'].date() if z.get('Datum_Obj') else None
+
+
+def _odvaha(zapasy, tipy, scores, cfg) -> np.ndarray:
+    """
+    Bonus za odvahu u každého tipu (zarovnaný s řádky TipTable): vítěze odehraného zápasu
+    tipovalo méně než underdog_threshold ze všech tipů na zápas.
+    """
+    known = scores.match_pos >= 0
+    pos = np.where(known, scores.match_pos, 0)
+    rd, rh = zapasy.score_home[pos], zapasy.score_away[pos]
+    picked = known & scores.finished & (rd != rh) & np.where(rd > rh, tipy.home > tipy.away, tipy.away > tipy.home)
+    n_tips = np.bincount(scores.match_pos[known], minlength=scores.n_matches)
+    n_picked = np.bincount(scores.match_pos[picked], minlength=scores.n_matches)
+    share = n_picked / np.maximum(n_tips, 1)
+    return np.where(picked & (share[pos] < cfg['underdog_threshold']), cfg['underdog_bonus'], 0)
+
+
+def _tiper_dne(scores, cfg, emails: list) -> dict:
+    """
+    Vítězové dnů (den se hodnotí, až když má výsledek každý jeho zápas).
+    Body za den jsou sloupec matice daily_points z hlavního průchodu (TipScores).
+    Soupeří jen registrovaní hráči (emails) - tipy smazaných nebo cizích emailů den nevyhrají.
+
+    Returns:
+        {den: {"winners": [emaily], "points": body vítěze, "bonus": bonus}}
+    """
+    registered = set(emails)
+    players = np.array([i for i, e in enumerate(scores.emails) if e in registered], dtype=np.int64)
+    days = {}
+    for code, day in enumerate(scores.days):
+        if not scores.day_finished[code]:
+            continue
+        daily_pts = scores.daily_points[players, code]
+        max_val = int(daily_pts.max(initial=0))
+        if max_val > 0:
+            days[day] = {
+                "winners": [scores.emails[i] for i in players[daily_pts == max_val]],
+                "points": max_val,
+                "bonus": cfg['tiper_dne_per_match'] * len(scores.day_matches[code]),
+            }
+    return days
+
+
+def _tiper_dne_log(days: dict, users) -> list:
+    """Vítězové dnů pro statistiky (po dnech, jména v pořadí hráčů)."""
+    order = {str(u['Email']): i for i, u in enumerate(users)}
+    names = {str(u['Email']): u['Jmeno'] for u in users}
+    log = []
+    for day in sorted(days):
+        result = days[day]
+        winners = sorted(result["winners"], key=lambda e: order.get(e, len(order)))
+        log.append({
+            "Datum": day,
+            "Jméno": ", ".join(names.get(w, w) for w in winners),
+            "Body ten den": result["points"],
+            "Bonus": result["bonus"]
+        })
+    return log
+
+
+class StandingsTimeline:
+    """
+    Průběžné body (zápasy + odvaha + tiper dne) a pořadí hráčů po každém odehraném zápasu.
+    Řádek 0 je stav před prvním zápasem, řádek i stav po i-tém zápasu (podle výkopu).
+
+    Atributy:
+        emails: hráči (sloupce)
+        kickoffs: výkopy odehraných zápasů s datem, seřazené
+        match_ids: ID zápasů v pořadí řádků (zápasy bez data jsou na konci)
+        points, ranks: matice (řádek = hranice zápasu, sloupec = hráč), pořadí jako v žebříčku (min)
+    """
+
+    def __init__(self, emails: list, kickoffs: list, match_ids: list, points: np.ndarray):
+        self.emails = emails
+        self.kickoffs = kickoffs
+        self.match_ids = match_ids
+        self.points = points
+        # Pořadí = 1 + počet hráčů s více body (shodné body = shodné pořadí)
+        ordered = np.sort(points, axis=1)
+        self.ranks = np.array([
+            1 + len(emails) - np.searchsorted(row_sorted, row, side='right')
+            for row, row_sorted in zip(points, ordered)
+        ], dtype=np.int64).reshape(points.shape)
+
+    @classmethod
+    def build(cls, zapasy, scores, tip_points, days: dict, emails: list):
+        """
+        Jeden průchod přes body tipů (tip_points = body + odvaha, zarovnané s řádky TipTable)
+        a vítěze dnů (viz _tiper_dne).
+        """
+        finished = [z for z in zapasy if z['is_finished']]
+        dated = sorted((z for z in finished if z.get('Datum_Obj')), key=lambda z: z['Datum_Obj'])
+        ordered = dated + [z for z in finished if not z.get('Datum_Obj')]
+        row_of = {z['ID']: i + 1 for i, z in enumerate(ordered)}
+        col_of = {e: i for i, e in enumerate(emails)}
+
+        # Řádek vývoje a sloupec hráče u každého tipu (-1 = neodehraný zápas / neznámý hráč)
+        row_of_pos = np.append([row_of.get(zid, -1) for zid in zapasy.ids], -1)[scores.match_pos]
+        col_of_code = np.array([col_of.get(e, -1) for e in scores.emails], dtype=np.int64)[scores.email_codes]
+        counted = (row_of_pos >= 0) & (col_of_code >= 0)
+        steps = np.zeros((len(ordered) + 1, len(emails)), dtype=np.float64)
+        np.add.at(steps, (row_of_pos[counted], col_of_code[counted]), tip_points[counted])
+
+        # Bonus tiper dne se připíše po posledním zápasu dne
+        last_of_day = {_match_day(z): row_of[z['ID']] for z in dated}
+        for day, result in days.items():
+            row = last_of_day.get(day)
+            if row is None:
+                continue
+            for email in result["winners"]:
+                if email in col_of:
+                    steps[row, col_of[email]] += result["bonus"]
+
+        return cls(emails, [z['Datum_Obj'] for z in dated], [z['ID'] for z in ordered], np.cumsum(steps, axis=0))
+
+    def row_at(self, when) -> int:
+        """Řádek stavu v čase when (započítané jsou zápasy s výkopem před when)."""
+        return bisect_left(self.kickoffs, when)
+
+    def points_at(self, when) -> dict:
+        return dict(zip(self.emails, self.points[self.row_at(when)].tolist()))
+
+    def ranks_at(self, when) -> dict:
+        return dict(zip(self.emails, self.ranks[self.row_at(when)].tolist()))
+
+
+@dataclass(frozen=True)
+class Standings:
+    """
+    Výsledek compute_standings - neměnný, sdílí se mezi sessions.
+    Součty jsou {email: hodnota} jen pro čtení, tabulku žebříčku vrací rank_table() jako kopii.
+    """
+    scores: object                  # TipScores
+    match_points: MappingProxyType
+    exact_matches: MappingProxyType
+    matches_scored: MappingProxyType
+    stats_basic: MappingProxyType
+    stats_playoff: MappingProxyType
+    bonus_odvaha: MappingProxyType
+    bonus_tiper_dne: MappingProxyType
+    bonus_ostrostrelci: MappingProxyType
+    long_term_points: MappingProxyType
+    total_points: MappingProxyType
+    tiper_dne_log: tuple
+    finished_matches: tuple
+    is_tournament_over: bool
+    tips_by_match: MappingProxyType  # ID zápasu -> tipy (pro statistiky)
+    timeline: StandingsTimeline
+    df_rank: pd.DataFrame
+    max_points: MappingProxyType     # nejvíc bodů, které hráč ještě může mít (viz max_achievable)
+    best_rank: MappingProxyType      # nejlepší pořadí, na které ještě dosáhne (> 3 = bez šance na bednu)
+
+    def rank_table(self) -> pd.DataFrame:
+        """Tabulka žebříčku (seřazená, se sloupcem Pořadí) - kopie, UI si do ní může přidávat sloupce."""
+        return self.df_rank.copy()
+
+    def rank_trends(self, when) -> dict:
+        """Pořadí hráčů v čase when (pro trend v žebříčku): {email: pořadí}."""
+        return self.timeline.ranks_at(when)
+
+
+def compute_standings(zapasy, tipy, users, config=None, official_results=None, now=None) -> Standings:
+    """
+    Spočítá celý žebříček z dat (MatchTable, TipTable, uživatelé).
+
+    Args:
+        config: pravidla bodování (výchozí POINTS_CONFIG)
+        official_results: konečné výsledky turnaje (výchozí OFFICIAL_RESULTS)
+        now: aktuální čas - zápasy s výkopem před now mají tipy uzavřené (jen pro max_achievable),
+             None = počítá se, jako by žádný zápas ještě nezačal
+    """
+    cfg = config or POINTS_CONFIG
+    official_results = OFFICIAL_RESULTS if official_results is None else official_results
+    emails = [str(u['Email']) for u in users]
+
+    finished_matches = tuple(z for z in zapasy if z['is_finished'])
+    is_tournament_over = len(finished_matches) == len(zapasy) and len(zapasy) > 0
+
+    tips_by_match = {}
+    for t in tipy:
+        tips_by_match.setdefault(t['Zapas_ID'], []).append(t)
+
+    # 1. Body všech tipů jedním průchodem, 2. odvaha a tiper dne ze stejných polí
+    scores = score_tips(zapasy, tipy, cfg)
+    odvaha = _odvaha(zapasy, tipy, scores, cfg)
+    days = _tiper_dne(scores, cfg, emails)
+    tiper_dne = {}
+    for result in days.values():
+        for w in result["winners"]:
+            tiper_dne[w] = tiper_dne.get(w, 0) + result["bonus"]
+
+    finished = scores.finished
+    stats_playoff_tip = np.append(zapasy.is_stats_playoff, False)[scores.match_pos]
+    sums = {
+        "points": scores.per_user(scores.points),
+        "exact": scores.per_user(scores.is_exact, finished),
+        "scored": scores.per_user(scores.scored, finished),
+        "playoff": scores.per_user(scores.points, stats_playoff_tip),
+        "odvaha": scores.per_user(odvaha),
+        "tiper_dne": tiper_dne,
+    }
+    totals = {name: {e: values.get(e, 0) for e in emails} for name, values in sums.items()}
+    match_points = totals["points"]
+    stats_playoff = totals["playoff"]
+    stats_basic = {e: match_points[e] - stats_playoff[e] for e in emails}
+
+    # 3. Bonus ostrostřelci (nejvíc přesných tipů, až po skončení turnaje)
+    exact_matches = totals["exact"]
+    max_exact = max(exact_matches.values(), default=0)
+    bonus_ostrostrelci = {
+        e: cfg['sharpshooter_bonus'] if (is_tournament_over and count == max_exact and max_exact > 0) else 0
+        for e, count in exact_matches.items()
+    }
+
+    # 4. Medaile / vítěz a celkový součet
+    long_term_points = {str(u['Email']): spocitej_dlouhodobe_body(u, official_results, cfg) for u in users}
+    total_points = {
+        e: match_points[e] + long_term_points[e] + bonus_ostrostrelci[e] + totals["odvaha"][e] + totals["tiper_dne"][e]
+        for e in emails
+    }
+
+    rd = []
+    for u in users:
+        e = str(u['Email'])
+        rd.append({
+            "Email": e,
+            "Hráč": u['Jmeno'],
+            "Tým": u.get('Tym', '-'),
+            "Zaplaceno": str(u.get('Zaplaceno', 'NE')).upper(),
+            "Body Zápasy": match_points[e],
+            "Tiper Dne": totals["tiper_dne"][e],
+            "Odvaha": totals["odvaha"][e],
+            "Medaile/Vítěz": long_term_points[e] + bonus_ostrostrelci[e],
+            "Celkem": total_points[e]
+        })
+    df_rank = pd.DataFrame(rd, columns=[
+        "Email", "Hráč", "Tým", "Zaplaceno", "Body Zápasy", "Tiper Dne", "Odvaha", "Medaile/Vítěz", "Celkem"
+    ]).sort_values("Celkem", ascending=False).reset_index(drop=True)
+    df_rank['Pořadí'] = df_rank['Celkem'].rank(method='min', ascending=False).astype(int)
+
+    max_points, best_rank = max_achievable(
+        zapasy, tipy, users, scores, total_points, exact_matches, is_tournament_over, cfg, official_results,
+        started=None if now is None else zapasy.locked(now)
+    )
+
+    frozen = MappingProxyType
+    return Standings(
+        scores=scores,
+        match_points=frozen(match_points),
+        exact_matches=frozen(exact_matches),
+        matches_scored=frozen(totals["scored"]),
+        stats_basic=frozen(stats_basic),
+        stats_playoff=frozen(stats_playoff),
+        bonus_odvaha=frozen(totals["odvaha"]),
+        bonus_tiper_dne=frozen(totals["tiper_dne"]),
+        bonus_ostrostrelci=frozen(bonus_ostrostrelci),
+        long_term_points=frozen(long_term_points),
+        total_points=frozen(total_points),
+        tiper_dne_log=tuple(_tiper_dne_log(days, users)),
+        finished_matches=finished_matches,
+        is_tournament_over=is_tournament_over,
+        tips_by_match=frozen(tips_by_match),
+        timeline=StandingsTimeline.build(zapasy, scores, scores.points + odvaha, days, emails),
+        df_rank=df_rank,
+        max_points=frozen(max_points),
+        best_rank=frozen(best_rank),
+    )
+
+
+def max_achievable(zapasy, tipy, users, scores, total_points, exact_matches,
+                   is_tournament_over, cfg, official_results, started=None) -> tuple:
+    """
+    Horní odhad konečných bodů každého hráče a nejlepší pořadí, na které ještě může dosáhnout.
+
+    Zbývající zápasy: u nezačatých může hráč tip ještě změnit a tipy ostatních můžou přibývat,
+    počítá se tedy přesný výsledek (+ prodloužení) a odvaha pro každého. U začatých zápasů
+    (started) jsou tipy uzavřené: výsledek přesně podle jeho tipu a odvaha, když jeho vítěze
+    tipuje málo lidí. Tiper dne za zbývající dny, které ještě může vyhrát
+    (ostatní už nepřijdou o body, které ten den mají), ostrostřelci, když ještě dožene nejlepšího
+    v přesných tipech, a medaile/vítěz podle jeho tipů (dokud nejsou známé výsledky).
+    Body ostatních nemůžou klesnout, takže pořadí 1 + počet hráčů, kteří už teď mají víc.
+
+    Args:
+        started: bool pole po zápasech - výkop už proběhl (None = žádný zápas ještě nezačal)
+
+    Returns:
+        ({email: max bodů}, {email: nejlepší možné pořadí})
+    """
+    emails = [str(u['Email']) for u in users]
+    user_of = {e: i for i, e in enumerate(emails)}
+    n_users = len(emails)
+    n_matches = len(zapasy)
+    started = np.zeros(n_matches, dtype=bool) if started is None else np.asarray(started, dtype=bool)
+    tip_user = np.array([user_of.get(e, -1) for e in tipy.emails], dtype=np.int64)[tipy.email_codes]
+    is_playoff, has_czech = match_modifiers(zapasy)
+    underdog_bonus = max(cfg['underdog_bonus'], 0)
+
+    # Nezačaté zápasy: nejlepší možný tip (přesný výsledek, prodloužení jen když přidá body) pro každého
+    fresh = np.flatnonzero(~zapasy.is_finished & ~started)
+    one, zero = np.ones(len(fresh), dtype=np.int32), np.zeros(len(fresh), dtype=np.int32)
+    fresh_best = np.zeros(len(fresh))
+    for ot in (False, True):
+        ot_col = np.full(len(fresh), ot)
+        pts, _, _, _ = spocitej_body_batch(one, zero, one, zero, is_playoff[fresh], has_czech[fresh], ot_col, ot_col, cfg)
+        fresh_best = np.maximum(fresh_best, pts)
+    potential = np.full(n_users, fresh_best.sum() + underdog_bonus * len(fresh))
+    exact_left = np.full(n_users, len(fresh), dtype=np.int64)
+
+    # Začaté zápasy bez výsledku: tipy, které můžou bodovat (bez remízy)
+    in_play = np.append(~zapasy.is_finished & started, False)[scores.match_pos]
+    live = in_play & (tip_user >= 0) & (tipy.home >= 0) & (tipy.away >= 0) & (tipy.home != tipy.away)
+    pos = scores.match_pos[live]
+    tip_best, _, _, _ = spocitej_body_batch(
+        tipy.home[live], tipy.away[live], tipy.home[live], tipy.away[live],
+        is_playoff[pos], has_czech[pos], tipy.overtime[live], tipy.overtime[live], cfg
+    )
+
+    # Odvaha: tipy jsou uzavřené, rozhoduje podíl tipujících na stejného vítěze (stejně jako _odvaha)
+    rows = scores.match_pos >= 0
+    crowd_total = np.bincount(scores.match_pos[rows], minlength=n_matches)
+    crowd_home = np.bincount(scores.match_pos[rows & (tipy.home > tipy.away)], minlength=n_matches)
+    crowd_away = np.bincount(scores.match_pos[rows & (tipy.away > tipy.home)], minlength=n_matches)
+    picked = np.where(tipy.home[live] > tipy.away[live], crowd_home[pos], crowd_away[pos])
+    underdog = picked / np.maximum(crowd_total[pos], 1) < cfg['underdog_threshold']
+    best = tip_best + underdog_bonus * underdog
+
+    players = tip_user[live]
+    potential += np.bincount(players, weights=best, minlength=n_users)
+    exact_left += np.bincount(players, minlength=n_users)
+
+    # Tiper dne: zbývající dny, kde hráč může dohnat nejlepší body ostatních
+    open_days = np.unique(scores.match_day[(~zapasy.is_finished) & (scores.match_day >= 0)])
+    if open_days.size and n_users:
+        day_now = np.zeros((n_users, len(open_days)))
+        for code, email in enumerate(scores.emails):
+            if email in user_of:
+                day_now[user_of[email]] = scores.daily_points[code, open_days]
+        day_max = day_now.copy()
+        # Zápasy bez data (match_day -1) do žádného dne nepatří
+        fresh_day = scores.match_day[fresh]
+        fresh_dated = fresh_day >= 0
+        day_max += np.bincount(
+            np.searchsorted(open_days, fresh_day[fresh_dated]), weights=fresh_best[fresh_dated], minlength=len(open_days)
+        )
+        tip_day = scores.match_day[pos]
+        dated = tip_day >= 0
+        np.add.at(day_max, (players[dated], np.searchsorted(open_days, tip_day[dated])), tip_best[dated])
+        others_best = np.array([np.delete(day_now, i, axis=0).max(axis=0, initial=0) for i in range(n_users)])
+        can_win = (day_max > 0) & (day_max >= others_best)
+        day_bonus = np.array([cfg['tiper_dne_per_match'] * len(scores.day_matches[d]) for d in open_days])
+        potential += (can_win * day_bonus).sum(axis=1)
+
+    # Ostrostřelci (udělí se až po posledním zápasu)
+    if not is_tournament_over and n_users:
+        exact_now = np.array([exact_matches[e] for e in emails])
+        rivals = np.array([np.delete(exact_now, i).max(initial=0) for i in range(n_users)])
+        reach = exact_now + exact_left
+        potential += cfg['sharpshooter_bonus'] * ((reach >= rivals) & (reach > 0))
+
+    # Vítěz a medaile, dokud nejsou oficiální výsledky
+    if not official_results.get('winner'):
+        for i, u in enumerate(users):
+            best_case = {
+                'winner': str(u.get('Tip_Vitez', '')),
+                'medals': [str(u.get(c, '')) for c in ('Tip_Med1', 'Tip_Med2', 'Tip_Med3')],
+            }
+            potential[i] += spocitej_dlouhodobe_body(u, best_case, cfg)
+
+    now = np.array([total_points[e] for e in emails], dtype=np.float64)
+    top = now + potential
+    best_rank = 1 + (now[None, :] > top[:, None]).sum(axis=1)
+    return dict(zip(emails, top.tolist())), dict(zip(emails, best_rank.tolist()))
+
+
+def data_version(zapasy, tipy, users, official_results):
+    """
+    Klíč verze dat pro StandingsCache: čas načtení zápasů a tipů + obsah uživatelů a výsledků turnaje.
+    None = verze není známá (tabulka bez loaded_at), počítá se vždy znovu.
+    """
+    if getattr(zapasy, 'loaded_at', None) is None or getattr(tipy, 'loaded_at', None) is None:
+        return None
+    return (
+        zapasy.loaded_at, tipy.loaded_at,
+        tuple(tuple(u.items()) for u in users),
+        official_results.get('winner'), tuple(official_results.get('medals', [])),
+    )
+
+
+class StandingsCache:
+    """
+    Jeden výsledek compute_standings na verzi dat pro všechny sessions procesu.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._version = None
+        self._result = None
+
+    def get(self, zapasy, tipy, users, official_results, now=None) -> Standings:
+        version = data_version(zapasy, tipy, users, official_results)
+        if version is not None and now is not None:
+            # Výkop dalšího zápasu uzavře jeho tipy a mění max_achievable
+            version += (int(zapasy.locked(now).sum()),)
+        with self.lock:
+            if version is None or version != self._version:
+                self._result = compute_standings(zapasy, tipy, users, official_results=official_results, now=now)
+                self._version = version
+            return self._result
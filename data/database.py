@@ -1,190 +1,442 @@
 """
-Datová vrstva - Google Sheets
-ZACHOVÁNO: Přesná logika z tipovacka_12.py s oauth2client
+Datová vrstva - načítání a zápis dat
+ZACHOVÁNO: Přesná logika z tipovacka_12.py, úložiště (Google Sheets / SQLite) viz data/storage.py
 """
 
 import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from datetime import datetime
-import os
-from utils.config import TIMEZONE, COL_TIP_DOMACI, COL_TIP_HOSTE, COL_TIP_PRODLOUZENI
+import threading
+import time
+from data.storage import get_storage
+from data.sync import get_tips_sync
+from data.journal import get_tip_journal, get_tip_flusher
+from data.store import MatchTable, TipTable, ChatLog
+from data.snapshot import read_snapshot, write_snapshot
+from data.shared import get_shared_store
+from data.quota import background_priority
+from utils.dates import parse_dates
+from utils.config import CHAT_PAGE_SIZE, MAX_SCORE_VALUE
+
+
+# --- VERZOVANÁ CACHE PO DATASETECH ---
+# Každý dataset má vlastní čítač verze. Zápis zvýší verzi jen dotčeného datasetu,
+# ostatní data zůstanou v cache (chat neshodí tipy, platba neshodí zápasy...).
+DATASETS = ("matches", "tips", "users", "config", "chat")
+
+# Listy, které se čtou celé (tipy se synchronizují zvlášť, z chatu se čte jen konec)
+DATASET_SHEETS = {"matches": "Zapasy", "users": "Uzivatele", "config": "Nastaveni"}
+
+CACHE_TTL = 60
+
+_versions_lock = threading.Lock()
+
+# Datasety, které se právě na pozadí načítají (obnova po startu ze snapshotu)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
 
 
 @st.cache_resource
-def get_gspread_client():
-    """
-    Vytvoří a drží spojení na API.
-    PŮVODNÍ FUNKCE z tipovacka_12.py
-    """
-    scope = [
-        'https://spreadsheets.google.com/feeds',
-        'https://www.googleapis.com/auth/drive'
-    ]
+def _dataset_versions() -> dict:
+    """Čítače verzí datasetů (sdílené všemi sessions procesu)."""
+    return {name: 0 for name in DATASETS}
+
+
+@st.cache_resource
+def _dataset_loaded() -> dict:
+    """Kdy a v jaké verzi se dataset naposledy opravdu načetl ({název: (verze, čas)})."""
+    return {}
+
+
+def _version(name: str) -> tuple:
+    """Verze datasetu pro cache: (čítač procesu, sdílený čítač všech procesů)."""
+    shared = get_shared_store()
+    return _dataset_versions()[name], shared.version(name) if shared is not None else 0
+
+
+def _is_stale(name: str) -> bool:
+    """Odhad, zda load_dataset(name) půjde do úložiště (nová verze nebo vypršelé TTL)."""
+    version, loaded_at = _dataset_loaded().get(name, (None, 0.0))
+    if version == _version(name) and time.time() - loaded_at < CACHE_TTL:
+        return False
+    # Čerstvá data už mohl stáhnout jiný proces
+    shared = get_shared_store()
+    return shared is None or not shared.is_fresh(name, CACHE_TTL)
+
+
+def invalidate(*datasets):
+    """Zneplatní cache jen zadaných datasetů (např. invalidate("chat")), i v ostatních procesech."""
+    versions = _dataset_versions()
+    with _versions_lock:
+        for name in datasets:
+            versions[name] += 1
+    shared = get_shared_store()
+    if shared is not None:
+        shared.bump(*datasets)
+
+
+# --- STAŽENÍ Z ÚLOŽIŠTĚ ---
+# Surové záznamy + meta; při více procesech je stahuje jen jeden (data/shared.py)
+
+def _fetch_chat():
+    # Jen poslední stránka zpráv + celkový počet, starší viz load_chat_messages
+    records, total = get_storage().load_tail("Chat", CHAT_PAGE_SIZE)
+    return records, {"total": total}
+
+
+_FETCHERS = {
+    "matches": lambda: (get_storage().load_records("Zapasy"), {}),
+    # Tipy se nestahují celé, ale synchronizují inkrementálně (data/sync.py)
+    "tips": lambda: (get_tips_sync().refresh(), {}),
+    "users": lambda: (get_storage().load_records("Uzivatele"), {}),
+    "config": lambda: (get_storage().load_records("Nastaveni"), {}),
+    "chat": _fetch_chat,
+}
+
+
+def _fetch(name: str) -> tuple:
+    """Stáhne dataset z úložiště: (záznamy, meta s časem začátku stahování)."""
+    loaded_at = time.time()
+    records, meta = _FETCHERS[name]()
+    return records, dict(meta, loaded_at=loaded_at)
+
+
+def _load_matches(records, meta):
+    # Celý sloupec Datum jedním průchodem (formát se určí jednou), viz utils/dates.py
+    dates = parse_dates(z.get('Datum') for z in records)
+    zapasy = []
+    for z, dt in zip(records, dates):
+        z_obj = z.copy()
+        z_obj['Datum_Obj'] = dt
+        zapasy.append(z_obj)
+    # Převod typů (ID, skóre, is_finished) jednou na verzi dat, viz data/store.py
+    return MatchTable(zapasy, meta['loaded_at'])
+
+
+def _load_tips(tipy_raw, meta):
+    # Kontrola odeslaných tipů + promítnutí čekajících z deníku (data/journal.py)
+    journal = get_tip_journal()
+    journal.reconcile(tipy_raw, meta['loaded_at'])
+    tipy_raw = journal.overlay(tipy_raw, meta['loaded_at'])
+    get_tip_flusher()  # Spustí odesílání i pro tipy, které v deníku zůstaly z minula
     
-    if os.path.exists('credentials.json'):
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
+    return TipTable(tipy_raw, meta['loaded_at'])
+
+
+def _load_users(records, meta):
+    return records
+
+
+def _load_config(nastaveni_raw, meta):
+    return {row['Klic']: row['Hodnota'] for row in nastaveni_raw}
+
+
+def _load_chat(records, meta):
+    return ChatLog(records, meta['total'])
+
+
+_LOADERS = {
+    "matches": _load_matches,
+    "tips": _load_tips,
+    "users": _load_users,
+    "config": _load_config,
+    "chat": _load_chat,
+}
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=20, show_spinner=False)
+def _load_dataset(name: str, version: tuple):
+    """Načte jeden dataset (cache klíč = název + verze, 60s TTL)."""
+    shared = get_shared_store()
+    if shared is None:
+        records, meta = _fetch(name)
     else:
-        creds_dict = dict(st.secrets["gcp_service_account"])
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    
-    return gspread.authorize(creds)
+        records, meta = shared.fetch(name, CACHE_TTL, lambda: _fetch(name))
+    data = _LOADERS[name](records, meta)
+    _dataset_loaded()[name] = (version, time.time())
+    write_snapshot(name, data)
+    return data
 
 
-@st.cache_resource
-def get_worksheets_resources():
+def _revalidate(name: str):
+    """Načte čerstvá data do cache na pozadí (pro každý dataset nejvýš jedno vlákno)."""
+    with _refreshing_lock:
+        if name in _refreshing:
+            return
+        _refreshing.add(name)
+
+    def run():
+        try:
+            with background_priority():
+                _load_dataset(name, _version(name))
+        except Exception:
+            pass  # Úložiště nedostupné - zkusí se znovu při dalším zobrazení
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(name)
+
+    threading.Thread(target=run, name=f"revalidate-{name}", daemon=True).start()
+
+
+def _read_snapshot(name: str):
     """
-    Otevře Spreadsheet a vrátí objekty Worksheetů.
-    PŮVODNÍ FUNKCE z tipovacka_12.py
+    Snapshot datasetu z disku. U tipů se znovu promítnou čekající tipy z deníku (jako v _load_tips),
+    aby tip uložený během výpadku úložiště nezmizel. Tabulka s promítnutými tipy nemá známou verzi.
     """
-    client = get_gspread_client()
-    sh = client.open("Tipovacka_Data")
-    
-    ws_zapasy = sh.worksheet("Zapasy")
-    ws_tipy = sh.worksheet("Tipy")
-    ws_users = sh.worksheet("Uzivatele")
-    
-    # Bezpečné načtení Nastavení
-    try:
-        ws_nastaveni = sh.worksheet("Nastaveni")
-    except gspread.WorksheetNotFound:
-        ws_nastaveni = None
-    
-    # Načtení chatu
-    try:
-        ws_chat = sh.worksheet("Chat")
-    except gspread.WorksheetNotFound:
-        ws_chat = sh.add_worksheet(title="Chat", rows=1000, cols=4)
-    
-    return ws_zapasy, ws_tipy, ws_users, ws_nastaveni, ws_chat
+    data = read_snapshot(name)
+    if name == "tips" and data is not None:
+        records = get_tip_journal().overlay(data, data.loaded_at or 0.0)
+        if records is not data:
+            data = TipTable(records)
+    return data
 
 
-def parse_date(date_str):
+def _cold_snapshot(name: str):
     """
-    Parse datum z Google Sheets.
-    PŮVODNÍ FUNKCE z tipovacka_12.py
+    Po startu procesu (dataset se ještě nenačetl a nikdo do něj nezapsal)
+    vrátí data ze snapshotu a čerstvá načte na pozadí. Jinak None.
     """
-    if not date_str:
+    if name in _dataset_loaded() or _dataset_versions()[name] != 0:
         return None
-    if isinstance(date_str, datetime):
-        return date_str
-    
-    dt = None
-    for fmt in ("%Y-%m-%d %H:%M", "%d.%m.%Y %H:%M", "%Y-%m-%d", "%d.%m.%Y"):
-        try:
-            dt = datetime.strptime(str(date_str), fmt)
-            break
-        except ValueError:
-            continue
-    
-    # Přiřadíme timezone Praha
-    if dt and dt.tzinfo is None:
-        return TIMEZONE.localize(dt)
-    return dt
+    data = _read_snapshot(name)
+    if data is not None:
+        _revalidate(name)
+    return data
+
+
+def load_dataset(name: str):
+    """
+    Vrátí aktuální verzi jednoho datasetu z cache.
+    Po restartu a při výpadku / limitu úložiště vrátí poslední snapshot z disku.
+    """
+    data = _cold_snapshot(name)
+    if data is not None:
+        return data
+    try:
+        return _load_dataset(name, _version(name))
+    except Exception:
+        data = _read_snapshot(name)
+        if data is None:
+            raise
+        return data
 
 
-@st.cache_data(ttl=60)
 def load_all_data():
     """
-    Načte všechna data s cachingem (60s TTL).
+    Načte všechna data s cachingem (60s TTL, každý dataset zvlášť).
     PŮVODNÍ LOGIKA z tipovacka_12.py
     
     Returns:
-        (zapasy, tipy, users, config, chat_data)
+        (zapasy, tipy, users, config, chat_data) - zapasy a tipy jako MatchTable / TipTable,
+        chat_data jako ChatLog (jen poslední stránka zpráv)
     """
-    ws_zapasy, ws_tipy, ws_users, ws_nastaveni, ws_chat = get_worksheets_resources()
-    
-    # Načtení dat
-    zapasy_raw = ws_zapasy.get_all_records()
-    tipy_raw = ws_tipy.get_all_records()
-    users_raw = ws_users.get_all_records()
-    chat_raw = ws_chat.get_all_records()
-    
-    # Zpracování zápasů
-    zapasy = []
-    for z in zapasy_raw:
-        z_obj = z.copy()
-        z_obj['Datum_Obj'] = parse_date(z.get('Datum'))
-        z_obj['ID'] = str(z['ID'])
-        zapasy.append(z_obj)
-    
-    # Zpracování tipů
-    tipy = []
-    for t in tipy_raw:
-        t_obj = t.copy()
-        t_obj['Zapas_ID'] = str(t['Zapas_ID'])
-        t_obj['Email'] = str(t['Email'])
-        tipy.append(t_obj)
-    
-    # Zpracování users
-    users = users_raw
-    
-    # Konfigurace
-    config = {}
-    if ws_nastaveni:
-        nastaveni_raw = ws_nastaveni.get_all_records()
-        config = {row['Klic']: row['Hodnota'] for row in nastaveni_raw}
-    
-    # Chat
-    chat_data = chat_raw
+    snapshots = {name: _cold_snapshot(name) for name in DATASETS}
     
-    return zapasy, tipy, users, config, chat_data
+    # Listy, které nejsou v cache, stáhneme jedním requestem místo jednoho za list
+    stale = [sheet for name, sheet in DATASET_SHEETS.items() if snapshots[name] is None and _is_stale(name)]
+    if len(stale) > 1:
+        try:
+            get_storage().prefetch(stale)
+        except Exception:
+            pass  # Jednotlivá načtení případně sáhnou po snapshotu
+    return tuple(
+        snapshots[name] if snapshots[name] is not None else load_dataset(name)
+        for name in DATASETS
+    )
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=20, show_spinner=False)
+def _load_chat_range(start: int, stop: int):
+    """Starší zprávy chatu (pořadí v listu se nemění, list se jen prodlužuje)."""
+    return get_storage().load_range("Chat", start, stop)
 
 
-def save_tips_batch(ws_tipy, user_email: str, tips_dict: dict, existing_tips: list):
+def load_chat_messages(limit: int) -> list:
+    """
+    Vrátí posledních limit zpráv chatu (od nejstarší).
+    Starší stránky než ta poslední se stahují až tady, tj. po kliknutí na "Načíst další".
+    """
+    chat = load_dataset("chat")
+    start = max(chat.total - limit, 0)
+    if start >= chat.start:
+        return list(chat)[start - chat.start:]
+    return _load_chat_range(start, chat.start) + list(chat)
+
+
+def save_tips_batch(user_email: str, tips_dict: dict, existing_tips: list):
     """
     Uloží tipy v dávce (batch).
     PŮVODNÍ FUNKCE z tipovacka_12.py s optimalizací
+    Tipy se trvale zapíšou do lokálního deníku a hned se potvrdí,
+    do úložiště je odešle vlákno na pozadí (sloučené s tipy ostatních).
+    Tipy beze změny proti existujícím se neukládají (formulář posílá všechny otevřené tipy).
     
     Args:
-        ws_tipy: Worksheet objekt
         user_email: Email uživatele
         tips_dict: {match_id: (home, away, ot)}
         existing_tips: Existující tipy
     """
-    all_data = ws_tipy.get_all_records()
-    
-    # Mapování: (Email, Zapas_ID) -> Číslo řádku (gspread index = i + 2)
-    existing_map = {}
-    for i, row in enumerate(all_data):
-        key = (str(row['Email']), str(row['Zapas_ID']))
-        existing_map[key] = i + 2
-    
-    updates = []
-    new_rows = []
-    
+    current = {
+        str(t['Zapas_ID']): (str(t.get('Tip_Domaci', '')), str(t.get('Tip_Hoste', '')), str(t.get('Tip_Prodlouzeni', '')))
+        for t in existing_tips if str(t['Email']) == str(user_email)
+    }
+    tips = {}
     for zid, (d, h, ot) in tips_dict.items():
         # Validace prodloužení
         final_ot = ot if abs(int(d) - int(h)) == 1 else ""
-        
-        key = (str(user_email), str(zid))
-        
-        if key in existing_map:
-            # UPDATE existujícího řádku
-            row_idx = existing_map[key]
-            updates.append(gspread.Cell(row_idx, COL_TIP_DOMACI, d))
-            updates.append(gspread.Cell(row_idx, COL_TIP_HOSTE, h))
-            updates.append(gspread.Cell(row_idx, COL_TIP_PRODLOUZENI, final_ot))
-        else:
-            # INSERT nového řádku
-            new_rows.append([user_email, zid, d, h, final_ot])
+        if current.get(str(zid)) == (str(int(d)), str(int(h)), final_ot):
+            continue
+        tips[zid] = (d, h, final_ot)
+    if not tips:
+        return
+    
+    get_tip_journal().append(user_email, tips)
+    get_tip_flusher().notify()
     
-    # Provedeme batch operace
-    if updates:
-        ws_tipy.update_cells(updates)
-    if new_rows:
-        ws_tipy.append_rows(new_rows)
+    # Invalidace cache (jen tipy)
+    invalidate("tips")
+
+
+def unconfirmed_tips(user_email: str) -> list:
+    """ID zápasů, jejichž uložený tip se opakovaně nepodařilo potvrdit v úložišti (zůstává ve frontě)."""
+    return get_tip_journal().unconfirmed(user_email)
+
+
+def compact_tips() -> int:
+    """
+    Přepíše list Tipy bez duplicitních řádků (admin údržba).
+    Při načtení se duplicity slučují vždy (TipTable), tohle jen zmenší list.
     
-    # Invalidace cache
-    st.cache_data.clear()
+    Returns:
+        Počet odstraněných řádků
+    """
+    removed = get_storage().compact_tips()
+    if removed:
+        get_tips_sync().reset()
+        invalidate("tips")
+    return removed
 
 
-def update_user_password(ws_users, user_idx: int, new_hash: str):
+def update_user_password(user_idx: int, new_hash: str):
     """
     Aktualizuje heslo uživatele (pro automatickou migraci na bcrypt).
     """
-    ws_users.update_cell(user_idx + 2, 3, new_hash)
-    st.cache_data.clear()
+    update_user_fields(user_idx, {'Heslo': new_hash})
+
+
+def update_user_fields(user_idx: int, fields: dict):
+    """
+    Přepíše vybrané údaje uživatele (tým, medaile, platba...).
+    
+    Args:
+        user_idx: Index uživatele v seznamu users
+        fields: {název sloupce: hodnota}
+    """
+    get_storage().update_user(user_idx, fields)
+    invalidate("users")
+
+
+def register_user(row: list):
+    """Zapíše nového uživatele (řádek ve struktuře listu Uzivatele)."""
+    get_storage().append_user(row)
+    invalidate("users")
+
+
+def post_chat_message(date_str: str, player_name: str, message: str):
+    """Přidá zprávu do diskuze."""
+    get_storage().append_chat([date_str, player_name, message])
+    invalidate("chat")
+
+
+def save_match_result(match_id, score_home, score_away, overtime) -> bool:
+    """
+    Uloží výsledek zápasu.
+    
+    Returns:
+        False pokud zápas nebyl nalezen
+    """
+    return not save_match_results({match_id: (score_home, score_away, overtime)})
+
+
+def save_match_results(results: dict) -> list:
+    """
+    Uloží výsledky více zápasů jedním zápisem a cache zápasů zneplatní jen jednou.
+    
+    Args:
+        results: {match_id: (score_home, score_away, overtime)} - viz validate_match_results
+    
+    Returns:
+        Seznam ID zápasů, které nebyly nalezeny
+    """
+    if not results:
+        return []
+    missing = get_storage().save_match_results(results)
+    if len(missing) < len(results):
+        invalidate("matches")
+    return missing
+
+
+def _clean_cell(value) -> str:
+    """Hodnota z editoru / CSV / JSON jako text ('5.0' -> '5', None -> '')."""
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    text = str(value).strip()
+    return text[:-2] if text.endswith(".0") and text[:-2].isdigit() else text
+
+
+def validate_match_results(rows: list, zapasy: list) -> tuple:
+    """
+    Hromadná kontrola výsledků (editor v adminu, import CSV/JSON).
+    Prázdné skóre u obou týmů = smazání výsledku.
+    
+    Args:
+        rows: [{'ID', 'Skore_Domaci', 'Skore_Hoste', 'Prodlouzeni'}]
+        zapasy: Načtené zápasy
+    
+    Returns:
+        ({match_id: (score_home, score_away, overtime)}, [chybové hlášky])
+    """
+    known = {str(z['ID']) for z in zapasy}
+    results = {}
+    errors = []
+    
+    for i, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append(f"Řádek {i}: očekává se objekt se sloupci ID, Skore_Domaci, Skore_Hoste, Prodlouzeni.")
+            continue
+        zid = _clean_cell(row.get('ID'))
+        d, h = _clean_cell(row.get('Skore_Domaci')), _clean_cell(row.get('Skore_Hoste'))
+        ot = _clean_cell(row.get('Prodlouzeni')).upper() or "NE"
+        label = f"Řádek {i} (zápas {zid or '?'})"
+        
+        if zid not in known:
+            errors.append(f"{label}: zápas s tímto ID neexistuje.")
+            continue
+        if zid in results:
+            errors.append(f"{label}: zápas je v datech vícekrát.")
+            continue
+        if ot not in ("ANO", "NE"):
+            errors.append(f"{label}: prodloužení musí být ANO nebo NE.")
+            continue
+        if d == "" and h == "":
+            results[zid] = ("", "", "")
+            continue
+        if not (d.isdigit() and h.isdigit()) or int(d) > MAX_SCORE_VALUE or int(h) > MAX_SCORE_VALUE:
+            errors.append(f"{label}: skóre musí být celá čísla 0-{MAX_SCORE_VALUE}.")
+            continue
+        if int(d) == int(h):
+            errors.append(f"{label}: zápas nemůže skončit remízou.")
+            continue
+        if ot == "ANO" and abs(int(d) - int(h)) != 1:
+            errors.append(f"{label}: v prodloužení se rozhoduje o jeden gól.")
+            continue
+        results[zid] = (int(d), int(h), ot)
+    
+    return results, errors
+
+
+def set_config_value(key: str, value):
+    """Nastaví hodnotu v listu Nastavení (např. oficiální medailisté)."""
+    get_storage().set_config(key, value)
+    invalidate("config")
 
 
 def create_reset_request(email: str):
@@ -192,15 +444,4 @@ def create_reset_request(email: str):
     Vytvoří požadavek na reset hesla v listu 'Reset'.
     PŮVODNÍ LOGIKA pro obnovu hesla.
     """
-    client = get_gspread_client()
-    sh = client.open("Tipovacka_Data")
-    
-    try:
-        ws_reset = sh.worksheet("Reset")
-    except gspread.WorksheetNotFound:
-        # Pokud list neexistuje, vytvoříme ho (bezpečnostní pojistka)
-        ws_reset = sh.add_worksheet(title="Reset", rows=1000, cols=3)
-        ws_reset.append_row(["Email", "Datum", "Status"]) # Hlavička
-    
-    # Zápis požadavku
-    ws_reset.append_row([email, str(datetime.now()), "PENDING"])
\ No newline at end of file
+    get_storage().create_reset_request(email)
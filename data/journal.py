@@ -0,0 +1,296 @@
+"""
+Deník tipů (write-behind)
+Uložení tipů se nejdřív trvale zapíše do lokálního SQLite deníku a hráč dostane
+potvrzení hned. Vlákno na pozadí pak čekající tipy všech hráčů sloučí a odešle
+do úložiště v jedné dávce (s opakováním při chybě).
+Deník může sdílet více procesů (repliky ve stejném adresáři) - odesílá vždy jen
+ten, kdo drží zámek odesílání (flush_claim), takže se žádný tip nepošle dvakrát.
+"""
+
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+import streamlit as st
+
+from data.quota import background_priority
+from data.storage import get_storage
+from utils.config import TIP_JOURNAL_PATH, TIP_FLUSH_DELAY, TIP_FLUSH_MAX_BACKOFF, TIP_FLUSH_LEASE
+
+# Ověřené záznamy starší než tato doba se z deníku mažou
+JOURNAL_RETENTION = 24 * 3600
+
+# Kolikrát se tip po odeslání nenašel v úložišti, než se hráči ukáže upozornění
+UNCONFIRMED_AFTER = 2
+
+
+def _same_tip(record: dict, d, h, ot) -> bool:
+    """Porovná tip z úložiště s hodnotami z deníku (typy se mohou lišit: 3 vs '3')."""
+    return (
+        str(record.get('Tip_Domaci', '')) == str(d)
+        and str(record.get('Tip_Hoste', '')) == str(h)
+        and str(record.get('Tip_Prodlouzeni', '')) == str(ot)
+    )
+
+
+class TipJournal:
+    """
+    Append-only deník uložených tipů.
+    Záznam je čekající (flushed_at IS NULL), odeslaný (flushed_at) a ověřený
+    (verified_at - tip byl po odeslání skutečně nalezen v úložišti).
+    requeued = kolikrát se odeslaný tip v úložišti nenašel a vrátil do fronty.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS journal ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "email TEXT NOT NULL, zapas_id TEXT NOT NULL, "
+                "tip_d, tip_h, tip_ot, "
+                "created_at REAL NOT NULL, flushed_at REAL, verified_at REAL, "
+                "requeued INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_journal_flushed ON journal (flushed_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_journal_key ON journal (email, zapas_id)")
+            # Zámek odesílání pro procesy sdílející deník (jediný řádek, vyprší po expires_at)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS flush_claim ("
+                "id INTEGER PRIMARY KEY CHECK (id = 1), owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def append(self, user_email: str, tips: dict):
+        """Trvale zapíše tipy jednoho hráče ({match_id: (home, away, ot)})."""
+        now = time.time()
+        rows = [(str(user_email), str(zid), d, h, ot, now) for zid, (d, h, ot) in tips.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO journal (email, zapas_id, tip_d, tip_h, tip_ot, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def pending(self) -> tuple:
+        """
+        Vrátí čekající tipy sloučené podle (Email, Zapas_ID) - platí poslední zápis.
+
+        Returns:
+            (ids všech čekajících záznamů, {email: {match_id: (home, away, ot)}})
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, email, zapas_id, tip_d, tip_h, tip_ot FROM journal "
+                "WHERE flushed_at IS NULL ORDER BY id"
+            ).fetchall()
+
+        ids = []
+        tips_by_user = {}
+        for rid, email, zid, d, h, ot in rows:
+            ids.append(rid)
+            tips_by_user.setdefault(email, {})[zid] = (d, h, ot)
+        return ids, tips_by_user
+
+    def mark_flushed(self, ids: list):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE journal SET flushed_at = ? WHERE id = ?", [(now, i) for i in ids])
+
+    def claim_flush(self, owner: str, lease: float) -> bool:
+        """
+        Zabere odesílání pro owner na lease sekund (jeden SQL příkaz = atomicky i mezi procesy).
+        False = odesílá jiný proces a jeho zámek ještě nevypršel.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO flush_claim (id, owner, expires_at) VALUES (1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE flush_claim.owner = excluded.owner OR flush_claim.expires_at < ?",
+                (owner, now + lease, now)
+            )
+        return cur.rowcount > 0
+
+    def release_flush(self, owner: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM flush_claim WHERE owner = ?", (owner,))
+
+    def _unsettled(self, loaded_at: float) -> dict:
+        """
+        Tipy, které v datech načtených v loaded_at ještě být nemusí: čekající a odeslané
+        až po začátku načtení (neověřené). Jen nejnovější zápis každého tipu.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT email, zapas_id, tip_d, tip_h, tip_ot FROM journal AS j "
+                "WHERE (flushed_at IS NULL OR (verified_at IS NULL AND flushed_at >= ?)) "
+                "AND id = (SELECT MAX(id) FROM journal WHERE email = j.email AND zapas_id = j.zapas_id) "
+                "ORDER BY id",
+                (loaded_at,)
+            ).fetchall()
+
+        tips_by_user = {}
+        for email, zid, d, h, ot in rows:
+            tips_by_user.setdefault(email, {})[zid] = (d, h, ot)
+        return tips_by_user
+
+    def overlay(self, records: list, loaded_at: float) -> list:
+        """
+        Promítne čekající tipy do načtených záznamů, aby hráč hned viděl,
+        co uložil (i když ještě nejsou v úložišti). Patří sem i tipy odeslané
+        během načítání - v právě načtených datech ještě být nemusí.
+        """
+        tips_by_user = self._unsettled(loaded_at)
+        if not tips_by_user:
+            return records
+
+        result = list(records)
+        positions = {(str(r['Email']), str(r['Zapas_ID'])): i for i, r in enumerate(result)}
+        for email, tips in tips_by_user.items():
+            for zid, (d, h, ot) in tips.items():
+                new_rec = {'Email': email, 'Zapas_ID': zid, 'Tip_Domaci': d, 'Tip_Hoste': h, 'Tip_Prodlouzeni': ot}
+                pos = positions.get((email, zid))
+                if pos is None:
+                    result.append(new_rec)
+                else:
+                    result[pos] = {**result[pos], **new_rec}
+        return result
+
+    def reconcile(self, records: list, loaded_at: float) -> int:
+        """
+        Kontrola po odeslání: odeslané tipy musí být v datech načtených po odeslání.
+        Chybějící nebo jiný tip se vrátí do fronty k opětovnému odeslání (i opakovaně,
+        tip se nikdy nezahodí - po UNCONFIRMED_AFTER pokusech ho hlásí unconfirmed).
+
+        Returns:
+            Počet záznamů vrácených do fronty
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, email, zapas_id, tip_d, tip_h, tip_ot FROM journal "
+                "WHERE verified_at IS NULL AND flushed_at IS NOT NULL AND flushed_at < ? ORDER BY id",
+                (loaded_at,)
+            ).fetchall()
+            newest = dict(self._conn.execute(
+                "SELECT email || '|' || zapas_id, MAX(id) FROM journal GROUP BY email, zapas_id"
+            ).fetchall())
+        if not rows:
+            return 0
+
+        stored = {(str(r['Email']), str(r['Zapas_ID'])): r for r in records}
+        verified, requeue = [], []
+        for rid, email, zid, d, h, ot in rows:
+            record = stored.get((email, zid))
+            superseded = newest.get(f"{email}|{zid}", rid) != rid
+            if superseded or (record is not None and _same_tip(record, d, h, ot)):
+                verified.append(rid)
+            else:
+                requeue.append(rid)
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE journal SET verified_at = ? WHERE id = ?", [(now, i) for i in verified])
+            self._conn.executemany(
+                "UPDATE journal SET flushed_at = NULL, requeued = requeued + 1 WHERE id = ?", [(i,) for i in requeue]
+            )
+        return len(requeue)
+
+    def unconfirmed(self, user_email: str) -> list:
+        """ID zápasů, jejichž tip hráče se ani po opakovaném odeslání v úložišti neobjevil."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT zapas_id FROM journal "
+                "WHERE email = ? AND verified_at IS NULL AND requeued >= ? "
+                "GROUP BY zapas_id ORDER BY MIN(id)",
+                (str(user_email), UNCONFIRMED_AFTER)
+            ).fetchall()
+        return [zid for (zid,) in rows]
+
+    def prune(self):
+        """Smaže staré ověřené záznamy, ať deník neroste donekonečna."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM journal WHERE verified_at IS NOT NULL AND verified_at < ?",
+                (time.time() - JOURNAL_RETENTION,)
+            )
+
+
+class TipFlusher(threading.Thread):
+    """
+    Vlákno, které odesílá čekající tipy z deníku do úložiště.
+    Po probuzení chvíli počká (TIP_FLUSH_DELAY), aby do dávky spadla uložení
+    od dalších hráčů, při chybě opakuje s exponenciálním odstupem a jitterem.
+    Po úspěšném odeslání zavolá on_flush (zneplatnění cache tipů).
+    """
+
+    def __init__(self, journal: TipJournal, storage, on_flush=None):
+        super().__init__(name="tip-flusher", daemon=True)
+        self.journal = journal
+        self.storage = storage
+        self.on_flush = on_flush
+        self.owner = uuid.uuid4().hex  # identita pro zámek odesílání ve sdíleném deníku
+        self.failures = 0
+        self.last_error = None
+        self._wake = threading.Event()
+
+    def notify(self):
+        """Probudí vlákno - v deníku jsou nové tipy."""
+        self._wake.set()
+
+    def flush_once(self) -> int:
+        """Odešle všechny čekající tipy jednou dávkou. Vrací počet odeslaných tipů."""
+        if not self.journal.claim_flush(self.owner, TIP_FLUSH_LEASE):
+            # Odesílá jiný proces se stejným deníkem - zkusíme to znovu po TIP_FLUSH_DELAY
+            self.notify()
+            return 0
+        try:
+            ids, tips_by_user = self.journal.pending()
+            if not ids:
+                return 0
+            self.storage.save_tips_bulk(tips_by_user)
+            self.journal.mark_flushed(ids)
+        finally:
+            self.journal.release_flush(self.owner)
+        if self.on_flush is not None:
+            self.on_flush()
+        return sum(len(t) for t in tips_by_user.values())
+
+    def run(self):
+        while True:
+            if self.failures == 0:
+                # Čekáme na nové tipy (s periodickou kontrolou pro jistotu)
+                self._wake.wait(timeout=60)
+                self._wake.clear()
+                time.sleep(TIP_FLUSH_DELAY)
+            else:
+                backoff = min(TIP_FLUSH_MAX_BACKOFF, TIP_FLUSH_DELAY * 2 ** self.failures)
+                time.sleep(backoff * random.uniform(0.5, 1.5))
+
+            try:
+                with background_priority():
+                    self.flush_once()
+                self.journal.prune()
+                self.failures = 0
+                self.last_error = None
+            except Exception as e:
+                self.failures += 1
+                self.last_error = e
+
+
+@st.cache_resource
+def get_tip_journal() -> TipJournal:
+    """Deník tipů sdílený všemi sessions procesu."""
+    return TipJournal(TIP_JOURNAL_PATH)
+
+
+@st.cache_resource
+def get_tip_flusher() -> TipFlusher:
+    """Spustí (jednou za proces) vlákno pro odesílání tipů."""
+    from data.database import invalidate  # data.database importuje tento modul
+    flusher = TipFlusher(get_tip_journal(), get_storage(), on_flush=lambda: invalidate("tips"))
+    flusher.start()
+    return flusher
@@ -0,0 +1,156 @@
+"""
+Hlídání kvóty Google Sheets API
+Každý HTTP request klienta gspread projde přes SheetsQuota:
+- rozpočet requestů za minutu (práce na pozadí smí jen část, zbytek je pro hráče),
+- opakování při 429 / 5xx / výpadku spojení s exponenciálním odstupem a jitterem
+  (zápisy POST jen když se request na server prokazatelně nedostal - jinak by se řádky zdvojily,
+  requesty hráče mají kratší časový rozpočet než práce na pozadí),
+- jistič (circuit breaker): po sérii chyb se API chvíli nevolá a chyba je okamžitá.
+"""
+
+import functools
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+import urllib3
+from gspread.exceptions import APIError
+
+from utils.config import (
+    SHEETS_REQUESTS_PER_MINUTE, SHEETS_BACKGROUND_SHARE, SHEETS_MAX_RETRIES,
+    SHEETS_MAX_BACKOFF, SHEETS_BREAKER_FAILURES, SHEETS_BREAKER_COOLDOWN,
+    SHEETS_FOREGROUND_RETRIES, SHEETS_FOREGROUND_BUDGET
+)
+
+# Kódy, u kterých má smysl to zkusit znovu
+RETRY_STATUS = (408, 429, 500, 502, 503, 504)
+
+# Zápis (POST: appendCells, append_row...) nemusí být idempotentní - opakuje se jen,
+# když ho server určitě neprovedl: odmítnutí kvótou (429) nebo chyba při navazování spojení
+WRITE_RETRY_STATUS = (429,)
+
+_local = threading.local()
+
+
+class CircuitOpenError(Exception):
+    """Sheets API je po opakovaných chybách dočasně vypnuté."""
+
+
+@contextmanager
+def background_priority():
+    """
+    Requesty uvnitř bloku jsou práce na pozadí (odesílání tipů, obnova cache):
+    čekají, dokud je v rozpočtu rezerva pro requesty hráčů.
+    """
+    previous = getattr(_local, "background", False)
+    _local.background = True
+    try:
+        yield
+    finally:
+        _local.background = previous
+
+
+def _not_sent(error: Exception) -> bool:
+    """Chyba při navazování spojení - request se na server vůbec nedostal."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        reason = getattr(error.args[0], "reason", error.args[0])
+        return isinstance(reason, urllib3.exceptions.NewConnectionError)
+    return False
+
+
+def _is_retryable(error: Exception, write: bool = False) -> bool:
+    if isinstance(error, APIError):
+        return error.code in (WRITE_RETRY_STATUS if write else RETRY_STATUS)
+    if write:
+        return _not_sent(error)
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def _is_write(args, kwargs) -> bool:
+    """Request klienta gspread je request(method, endpoint, ...)."""
+    method = kwargs.get("method", args[0] if args else "")
+    return str(method).upper() == "POST"
+
+
+class SheetsQuota:
+    """Rozpočet requestů, opakování a jistič pro jednoho klienta (sdílené vlákny procesu)."""
+
+    def __init__(self, per_minute: int = SHEETS_REQUESTS_PER_MINUTE):
+        self.per_minute = per_minute
+        self.failures = 0          # chyby za sebou
+        self.opened_at = None      # kdy se jistič otevřel (None = zavřený)
+        self._sent = deque()       # časy odeslaných requestů za poslední minutu
+        self._cond = threading.Condition()
+
+    def _acquire(self):
+        """Počká, až je v rozpočtu místo, a zapíše request."""
+        background = getattr(_local, "background", False)
+        limit = max(1, int(self.per_minute * SHEETS_BACKGROUND_SHARE)) if background else self.per_minute
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= 60:
+                    self._sent.popleft()
+                if len(self._sent) < limit:
+                    self._sent.append(now)
+                    return
+                # Místo se uvolní, až nejstarší potřebný request vypadne z okna
+                wait = self._sent[len(self._sent) - limit] + 60 - now
+                self._cond.wait(timeout=max(wait, 0.05))
+
+    def _check_circuit(self):
+        with self._cond:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < SHEETS_BREAKER_COOLDOWN:
+                raise CircuitOpenError("Google Sheets je dočasně nedostupné, zkus to za chvíli.")
+            # Po vychladnutí pustíme jeden zkušební request, ostatní čekají na jeho výsledek
+            self.opened_at = time.monotonic()
+
+    def _record(self, ok: bool):
+        with self._cond:
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.failures >= SHEETS_BREAKER_FAILURES:
+                    self.opened_at = time.monotonic()
+
+    def call(self, func, *args, **kwargs):
+        """Zavolá func (HTTP request) s rozpočtem, opakováním a jističem."""
+        write = _is_write(args, kwargs)
+        # Hráč nečeká na dlouhé opakování - request v překreslení stránky má omezený rozpočet
+        background = getattr(_local, "background", False)
+        retries = SHEETS_MAX_RETRIES if background else SHEETS_FOREGROUND_RETRIES
+        deadline = None if background else time.monotonic() + SHEETS_FOREGROUND_BUDGET
+        for attempt in range(retries + 1):
+            self._check_circuit()
+            self._acquire()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not _is_retryable(e, write):
+                    raise
+                self._record(False)
+                if attempt == retries or self.opened_at is not None:
+                    raise
+                backoff = min(SHEETS_MAX_BACKOFF, 2 ** attempt) * random.uniform(0.5, 1.5)
+                if deadline is not None and time.monotonic() + backoff > deadline:
+                    raise
+                time.sleep(backoff)
+                continue
+            self._record(True)
+            return result
+
+    def wrap(self, request):
+        """Obalí metodu request HTTP klienta."""
+        @functools.wraps(request)
+        def guarded(*args, **kwargs):
+            return self.call(request, *args, **kwargs)
+        return guarded
@@ -0,0 +1,243 @@
+"""
+Sdílený snapshot dat pro více procesů serveru (repliky za proxy)
+Dataset stahuje z úložiště vždy jen jeden proces (zámek souboru), výsledek zapíše
+jako sloupcový soubor .npy a ostatní procesy ho jen namapují do paměti (mmap),
+takže další repliky nepřidávají requesty na Google Sheets.
+
+Soubory v adresáři SHARED_DATA_DIR:
+    <dataset>.version   sdílený čítač verze (int64 mapovaný do paměti, zvyšuje ho zápis)
+    <dataset>.json      manifest: datový soubor, verze, čas stažení, sloupce, meta
+    <dataset>-<n>.npy   data (strukturované pole, co sloupec to pole)
+    <dataset>.lock      zámek procesu, který právě stahuje (.version.lock pro čítač)
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import streamlit as st
+
+from utils.config import SHARED_DATA_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows - zámek mezi procesy není, stačí pro vývoj s jedním procesem
+    fcntl = None
+
+# Typy hodnot ve smíšeném sloupci (hodnota je uložená jako text)
+KIND_STR, KIND_INT, KIND_FLOAT, KIND_NONE, KIND_BOOL = range(5)
+
+_DECODE = {
+    KIND_STR: str,
+    KIND_INT: int,
+    KIND_FLOAT: float,
+    KIND_NONE: lambda v: None,
+    KIND_BOOL: lambda v: v == "True",
+}
+
+# Celočíselný sloupec se ukládá jako int64, větší čísla jako smíšený sloupec
+INT_LIMIT = 2 ** 62
+
+
+def _kind(value) -> int:
+    if value is None:
+        return KIND_NONE
+    if isinstance(value, bool):
+        return KIND_BOOL
+    if isinstance(value, int):
+        return KIND_INT
+    if isinstance(value, float):
+        return KIND_FLOAT
+    return KIND_STR
+
+
+def _is_int_column(values: list) -> bool:
+    return all(_kind(v) == KIND_INT and -INT_LIMIT < v < INT_LIMIT for v in values)
+
+
+def encode_records(records: list) -> tuple:
+    """
+    Převede záznamy (seznam slovníků) na strukturované pole po sloupcích.
+
+    Returns:
+        (pole, sloupce) - sloupce jsou [(název, "int" | "mixed")] v pořadí klíčů
+    """
+    names = []
+    for r in records:
+        names.extend(k for k in r if k not in names)
+
+    fields, columns, data = [], [], {}
+    for name in names:
+        values = [r.get(name, "") for r in records]
+        if _is_int_column(values):
+            fields.append((f"v:{name}", np.int64))
+            data[f"v:{name}"] = values
+            columns.append((name, "int"))
+        else:
+            texts = ["" if v is None else str(v) for v in values]
+            width = max((len(t) for t in texts), default=0) or 1
+            fields += [(f"v:{name}", f"<U{width}"), (f"k:{name}", np.int8)]
+            data[f"v:{name}"] = texts
+            data[f"k:{name}"] = [_kind(v) for v in values]
+            columns.append((name, "mixed"))
+
+    arr = np.zeros(len(records), dtype=fields or [("_", np.int8)])
+    for field, values in data.items():
+        arr[field] = values
+    return arr, columns
+
+
+def decode_records(arr, columns: list) -> list:
+    """Opak encode_records - záznamy se stejnými hodnotami i typy."""
+    cols = []
+    for name, kind in columns:
+        values = arr[f"v:{name}"].tolist()
+        if kind == "mixed":
+            values = [_DECODE[k](v) for v, k in zip(values, arr[f"k:{name}"].tolist())]
+        cols.append(values)
+    names = [name for name, _ in columns]
+    return [dict(zip(names, row)) for row in zip(*cols)] if cols else [{} for _ in range(len(arr))]
+
+
+@contextmanager
+def _file_lock(path: str, blocking: bool = True):
+    """Exkluzivní zámek souboru mezi procesy. Vrací False, když je obsazený (blocking=False)."""
+    with open(path, "a+b") as f:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SharedStore:
+    """Sdílené verze a snapshoty datasetů v jednom adresáři (pro všechny procesy na stroji)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._counters = {}  # dataset -> namapovaný čítač verze
+        self._mapped = {}    # dataset -> (datový soubor, namapované pole)
+        self._lock = threading.Lock()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _counter(self, name: str):
+        with self._lock:
+            counter = self._counters.get(name)
+            if counter is None:
+                path = self._file(f"{name}.version")
+                with _file_lock(self._file(f"{name}.version.lock")):
+                    if not os.path.exists(path) or os.path.getsize(path) < 8:
+                        np.zeros(1, dtype=np.int64).tofile(path)
+                counter = self._counters[name] = np.memmap(path, dtype=np.int64, mode="r+", shape=(1,))
+            return counter
+
+    def version(self, name: str) -> int:
+        """Sdílená verze datasetu (čtení z paměti, bez přístupu na disk)."""
+        return int(self._counter(name)[0])
+
+    def bump(self, *names):
+        """Zvýší sdílenou verzi datasetů - ostatní procesy je načtou znovu."""
+        for name in names:
+            counter = self._counter(name)
+            with _file_lock(self._file(f"{name}.version.lock")):
+                counter[0] += 1
+                counter.flush()
+
+    def _manifest(self, name: str):
+        try:
+            with open(self._file(f"{name}.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_fresh(self, manifest, version: int, max_age: float) -> bool:
+        return (
+            manifest is not None
+            and manifest["version"] == version
+            and time.time() - manifest["meta"]["loaded_at"] < max_age
+        )
+
+    def is_fresh(self, name: str, max_age: float) -> bool:
+        """Je sdílený snapshot v aktuální verzi a mladší než max_age?"""
+        return self._is_fresh(self._manifest(name), self.version(name), max_age)
+
+    def _read(self, name: str, manifest: dict) -> tuple:
+        """Záznamy ze snapshotu (datový soubor se mapuje do paměti, jen jednou za proces)."""
+        with self._lock:
+            data_file, arr = self._mapped.get(name, (None, None))
+            if data_file != manifest["file"]:
+                arr = np.load(self._file(manifest["file"]), mmap_mode="r")
+                self._mapped[name] = (manifest["file"], arr)
+        columns = [tuple(c) for c in manifest["columns"]]
+        return decode_records(arr, columns), dict(manifest["meta"])
+
+    def _publish(self, name: str, version: int, records: list, meta: dict):
+        """Zapíše nový datový soubor a atomicky přepne manifest, staré soubory uklidí."""
+        arr, columns = encode_records(records)
+        data_file = f"{name}-{time.time_ns()}.npy"
+        np.save(self._file(data_file), arr)
+
+        previous = self._manifest(name)
+        keep = {data_file, previous["file"] if previous else None}
+
+        manifest_path = self._file(f"{name}.json")
+        tmp = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"file": data_file, "version": version, "columns": columns, "meta": meta}, f)
+        os.replace(tmp, manifest_path)
+
+        # Předchozí soubor necháme pro procesy, které právě čtou starý manifest.
+        # Kdo má starší soubor už namapovaný, čte ho dál (smazání mu nevadí).
+        for old in os.listdir(self.path):
+            if old.startswith(f"{name}-") and old.endswith(".npy") and old not in keep:
+                try:
+                    os.remove(self._file(old))
+                except OSError:
+                    pass
+
+    def fetch(self, name: str, max_age: float, loader) -> tuple:
+        """
+        Vrátí (záznamy, meta) datasetu. Čerstvý snapshot se jen přečte, jinak data
+        stáhne jeden proces (loader) a ostatní počkají na jeho výsledek. Když se
+        stahuje jen kvůli stáří (verze sedí), ostatní zatím dostanou předchozí snapshot.
+        """
+        version = self.version(name)
+        manifest = self._manifest(name)
+        if self._is_fresh(manifest, version, max_age):
+            return self._read(name, manifest)
+
+        same_version = manifest is not None and manifest["version"] == version
+        with _file_lock(self._file(f"{name}.lock"), blocking=not same_version) as locked:
+            if not locked:
+                return self._read(name, manifest)
+
+            # Mezitím mohl data stáhnout jiný proces
+            version = self.version(name)
+            manifest = self._manifest(name)
+            if self._is_fresh(manifest, version, max_age):
+                return self._read(name, manifest)
+
+            records, meta = loader()
+            self._publish(name, version, records, meta)
+            return records, meta
+
+
+@st.cache_resource
+def get_shared_store():
+    """Sdílené úložiště snapshotů, nebo None (SHARED_DATA_DIR není nastavený = jeden proces)."""
+    if not SHARED_DATA_DIR:
+        return None
+    return SharedStore(SHARED_DATA_DIR)
@@ -0,0 +1,575 @@
+"""
+Úložiště - Google Sheets
+ZACHOVÁNO: Přesná logika z tipovacka_12.py s oauth2client
+"""
+
+import streamlit as st
+import gspread
+from gspread.utils import absolute_range_name, numericise, numericise_all, rowcol_to_a1
+from oauth2client.service_account import ServiceAccountCredentials
+from datetime import datetime
+import os
+import threading
+import time
+
+from data.quota import SheetsQuota
+from data.storage import StorageBackend
+from utils.config import (
+    SPREADSHEET_NAME, SPREADSHEET_KEY, SHEET_COLUMNS, SHEETS_TIMEOUT,
+    COL_TIP_DOMACI
+)
+
+
+@st.cache_resource
+def get_gspread_client():
+    """
+    Vytvoří a drží spojení na API.
+    PŮVODNÍ FUNKCE z tipovacka_12.py
+    """
+    scope = [
+        'https://spreadsheets.google.com/feeds',
+        'https://www.googleapis.com/auth/drive'
+    ]
+
+    if os.path.exists('credentials.json'):
+        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
+    else:
+        creds_dict = dict(st.secrets["gcp_service_account"])
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+
+    client = gspread.authorize(creds)
+    
+    # Všechny requesty přes hlídání kvóty (rozpočet, opakování, jistič), viz data/quota.py
+    client.set_timeout(SHEETS_TIMEOUT)
+    http = getattr(client, "http_client", client)  # gspread 6 / 5
+    http.request = SheetsQuota().wrap(http.request)
+    return client
+
+
+def _spreadsheet_key() -> str:
+    """Klíč (ID) tabulky z configu / env, případně ze secrets (spreadsheet_key)."""
+    if SPREADSHEET_KEY:
+        return SPREADSHEET_KEY
+    try:
+        return str(st.secrets.get("spreadsheet_key", ""))
+    except Exception:
+        return ""
+
+
+@st.cache_resource
+def get_spreadsheet():
+    """
+    Otevře Spreadsheet podle klíče (bez hledání v Drive).
+    Když klíč není nastavený, hledá se postaru podle názvu.
+    """
+    client = get_gspread_client()
+    key = _spreadsheet_key()
+    if key:
+        return client.open_by_key(key)
+    return client.open(SPREADSHEET_NAME)
+
+
+@st.cache_resource
+def get_sheet_layout() -> dict:
+    """
+    Metadata tabulky načtená jednou za proces:
+    worksheets {název: Worksheet} (jeden request) a headers {název: hlavička} (jeden batch request).
+    Nově založené listy se sem doplňují, aby se nemuselo načítat znovu.
+    """
+    sh = get_spreadsheet()
+    worksheets = {ws.title: ws for ws in sh.worksheets()}
+    titles = list(worksheets)
+    headers = {}
+    if titles:
+        resp = sh.values_batch_get([absolute_range_name(t, "1:1") for t in titles], params=_read_params())
+        for title, vr in zip(titles, resp['valueRanges']):
+            headers[title] = [str(h) for h in (vr.get('values') or [[]])[0]]
+    return {"worksheets": worksheets, "headers": headers}
+
+
+_layout_lock = threading.Lock()
+
+
+def _get_or_create_worksheet(title: str, rows: int = 1000):
+    """Vrátí list z metadat, pokud chybí, založí ho i s hlavičkou."""
+    layout = get_sheet_layout()
+    with _layout_lock:
+        ws = layout["worksheets"].get(title)
+        if ws is None:
+            header = SHEET_COLUMNS[title]
+            ws = get_spreadsheet().add_worksheet(title=title, rows=rows, cols=len(header))
+            ws.append_row(header)
+            layout["worksheets"][title] = ws
+            layout["headers"][title] = list(header)
+    return ws
+
+
+def get_worksheets_resources():
+    """
+    Vrátí objekty Worksheetů (z metadat načtených jednou za proces).
+    PŮVODNÍ FUNKCE z tipovacka_12.py
+    """
+    worksheets = get_sheet_layout()["worksheets"]
+    missing = [t for t in ("Zapasy", "Tipy", "Uzivatele") if t not in worksheets]
+    if missing:
+        raise gspread.WorksheetNotFound(missing[0])
+
+    ws_zapasy = worksheets["Zapasy"]
+    ws_tipy = worksheets["Tipy"]
+    ws_users = worksheets["Uzivatele"]
+
+    # Bezpečné načtení Nastavení
+    ws_nastaveni = worksheets.get("Nastaveni")
+
+    # Načtení chatu
+    ws_chat = _get_or_create_worksheet("Chat")
+
+    return ws_zapasy, ws_tipy, ws_users, ws_nastaveni, ws_chat
+
+
+def get_tips_log_worksheet():
+    """
+    Vrátí list Tipy_Zmeny (log změn tipů), pokud chybí, založí ho.
+    """
+    return _get_or_create_worksheet("Tipy_Zmeny")
+
+
+def _read_params() -> dict:
+    """
+    Parametry čtení hodnot: čísla jako čísla (bez formátování), datumy jako text z tabulky.
+    Pokaždé nový slovník - gspread do něj při values_batch_get zapisuje "ranges".
+    """
+    return {
+        "valueRenderOption": "UNFORMATTED_VALUE",
+        "dateTimeRenderOption": "FORMATTED_STRING",
+    }
+
+# Jak dlouho platí data stažená přes prefetch (pak se čte znovu)
+PREFETCH_MAX_AGE = 10
+
+# Značka v logu změn (sloupec Radek): list Tipy se přepsal, čísla řádků před ní neplatí
+LOG_REWRITE_MARK = "PREPSANO"
+
+
+def _header(sheet: str) -> list:
+    """Hlavička listu z metadat (skutečné pořadí sloupců), jinak podle SHEET_COLUMNS."""
+    return get_sheet_layout()["headers"].get(sheet) or SHEET_COLUMNS[sheet]
+
+
+def _col(sheet: str, name: str) -> int:
+    """Vrátí 1-based index sloupce podle názvu (gspread je 1-based)."""
+    header = _header(sheet)
+    if name in header:
+        return header.index(name) + 1
+    return SHEET_COLUMNS[sheet].index(name) + 1
+
+
+def _to_record(header: list, values: list) -> dict:
+    """Převede surový řádek na záznam stejně jako get_all_records (čísla jako čísla)."""
+    values = numericise_all(list(values) + [""] * (len(header) - len(values)))
+    return dict(zip(header, values[:len(header)]))
+
+
+def _col_letter(col: int) -> str:
+    """Písmeno sloupce (1 -> A)."""
+    return rowcol_to_a1(1, col)[:-1]
+
+
+def _tail_range(title: str, known_rows: int, last_col: str) -> str:
+    """
+    Rozsah od posledního známého datového řádku do konce listu.
+    Poslední známý řádek čteme znovu - slouží jako kontrola konzistence
+    a zároveň rozsah nikdy nepřeleze velikost mřížky listu.
+    """
+    first = known_rows + 1 if known_rows else 2
+    return absolute_range_name(title, f"A{first}:{last_col}")
+
+
+def _cell_data(value) -> dict:
+    """Hodnota buňky pro batchUpdate API (čísla jako čísla, zbytek jako text - jako USER_ENTERED)."""
+    value = numericise(value) if isinstance(value, str) else value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+
+def _row_data(values: list) -> dict:
+    return {"values": [_cell_data(v) for v in values]}
+
+
+def _tip_key(record: dict) -> tuple:
+    """Klíč tipu (Email, Zapas_ID) jako text - v listu bývá ID číslo i text."""
+    return (str(record.get('Email', '')), str(record.get('Zapas_ID', '')))
+
+
+class TipsRowIndex:
+    """
+    Index (Email, Zapas_ID) -> číslo řádku v listu Tipy.
+    Plní se zadarmo z inkrementální synchronizace (load_tips_full / load_tips_delta),
+    takže uložení tipů nemusí předem stahovat celý list.
+    Řádky se běžně jen přidávají na konec, list ale může někdo přeskládat (slučování
+    duplicit, ruční úpravy) - před každým zápisem se proto index ověří (_refresh_tips_index).
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.keys = []         # klíč na datovém řádku i (řádek v listu = i + 2)
+        self.rows = {}         # klíč -> číslo řádku (u duplicit poslední výskyt)
+        self.ready = False
+
+    def rebuild(self, keys: list):
+        with self.lock:
+            self.keys = []
+            self.rows = {}
+            self.ready = True
+            self.extend(keys)
+
+    def extend(self, keys: list):
+        """Přidá klíče řádků, které následují za posledním známým řádkem."""
+        with self.lock:
+            for key in keys:
+                self.rows[key] = len(self.keys) + 2
+                self.keys.append(key)
+
+    def apply(self, changes: dict):
+        """Zapracuje změny z delta synchronizace ({index řádku: záznam})."""
+        with self.lock:
+            for idx in sorted(changes):
+                if idx == len(self.keys):
+                    self.extend([_tip_key(changes[idx])])
+                elif idx > len(self.keys):
+                    # Díra v datech - index při příštím zápisu postavíme znovu
+                    self.ready = False
+                    return
+
+
+class SheetsStorage(StorageBackend):
+    """Úložiště nad Google Sheets (gspread)."""
+
+    def __init__(self):
+        self._tips_index = TipsRowIndex()
+        self._prefetched = {}  # list -> (čas stažení, záznamy)
+        self._row_counts = {}  # list -> poslední známý počet datových řádků (pro load_tail)
+        self._prefetch_lock = threading.Lock()
+
+    def _worksheet(self, sheet: str):
+        ws_zapasy, ws_tipy, ws_users, ws_nastaveni, ws_chat = get_worksheets_resources()
+        return {
+            "Zapasy": ws_zapasy,
+            "Tipy": ws_tipy,
+            "Uzivatele": ws_users,
+            "Nastaveni": ws_nastaveni,
+            "Chat": ws_chat,
+        }[sheet]
+
+    def _read_records(self, sheets: list) -> dict:
+        """Stáhne celé listy jedním requestem, hlavičku zpracuje lokálně."""
+        worksheets = {s: self._worksheet(s) for s in sheets}
+        result = {s: [] for s, ws in worksheets.items() if ws is None}
+        present = [s for s, ws in worksheets.items() if ws is not None]
+        if not present:
+            return result
+
+        sh = worksheets[present[0]].spreadsheet
+        resp = sh.values_batch_get([absolute_range_name(worksheets[s].title) for s in present], params=_read_params())
+        for s, vr in zip(present, resp['valueRanges']):
+            values = vr.get('values', [])
+            result[s] = [_to_record(values[0], row) for row in values[1:]] if values else []
+        return result
+
+    def _count_rows(self, ws) -> int:
+        values = ws.spreadsheet.values_get(absolute_range_name(ws.title, "A:A"), params=_read_params()).get('values', [])
+        return max(len(values) - 1, 0)
+
+    def load_tail(self, sheet: str, count: int) -> tuple:
+        ws = self._worksheet(sheet)
+        if ws is None:
+            return [], 0
+        cols = _header(sheet)
+        last_col = _col_letter(len(cols))
+
+        def read_from(first):
+            # Od řádku first do konce listu (konec listu = i nově přidané řádky)
+            return ws.spreadsheet.values_get(
+                absolute_range_name(ws.title, f"A{first + 2}:{last_col}"), params=_read_params()
+            ).get('values', [])
+
+        # Počet řádků známe z minula (list se jen prodlužuje), jinak ho jednou spočítáme
+        known = self._row_counts.get(sheet)
+        if known is None:
+            known = self._count_rows(ws)
+        first = max(known - count, 0)
+        values = read_from(first)
+
+        if len(values) < known - first:
+            # List se mezitím zkrátil (ruční mazání) - spočítáme znovu
+            known = self._count_rows(ws)
+            first = max(known - count, 0)
+            values = read_from(first)
+
+        total = first + len(values)
+        self._row_counts[sheet] = total
+        records = [_to_record(cols, row) for row in values]
+        return records[-count:] if count else [], total
+
+    def load_range(self, sheet: str, start: int, stop: int) -> list:
+        ws = self._worksheet(sheet)
+        if ws is None or stop <= start:
+            return []
+        cols = _header(sheet)
+        values = ws.spreadsheet.values_get(
+            absolute_range_name(ws.title, f"A{start + 2}:{_col_letter(len(cols))}{stop + 1}"), params=_read_params()
+        ).get('values', [])
+        return [_to_record(cols, row) for row in values]
+
+    def prefetch(self, sheets: list):
+        with self._prefetch_lock:
+            now = time.time()
+            for s, records in self._read_records(sheets).items():
+                self._prefetched[s] = (now, records)
+
+    def load_records(self, sheet: str) -> list:
+        with self._prefetch_lock:
+            loaded_at, records = self._prefetched.pop(sheet, (0.0, None))
+        if records is not None and time.time() - loaded_at < PREFETCH_MAX_AGE:
+            return records
+        return self._read_records([sheet])[sheet]
+
+    def load_tips_full(self) -> tuple:
+        ws_tipy = self._worksheet("Tipy")
+        ws_log = get_tips_log_worksheet()
+
+        # Jeden request: celý list Tipy + počet záznamů v logu změn
+        resp = ws_tipy.spreadsheet.values_batch_get([
+            absolute_range_name(ws_tipy.title),
+            absolute_range_name(ws_log.title, "A:A"),
+        ], params=_read_params())
+        tip_values, log_values = [vr.get('values', []) for vr in resp['valueRanges']]
+
+        records = []
+        if tip_values:
+            header = tip_values[0]
+            records = [_to_record(header, row) for row in tip_values[1:]]
+        log_count = max(len(log_values) - 1, 0)
+        self._tips_index.rebuild([_tip_key(r) for r in records])
+        return records, (len(records), log_count)
+
+    def load_tips_delta(self, cursor, last_row: dict):
+        n_tips, n_log = cursor
+        ws_tipy = self._worksheet("Tipy")
+        ws_log = get_tips_log_worksheet()
+        tip_cols = SHEET_COLUMNS["Tipy"]
+        log_cols = SHEET_COLUMNS["Tipy_Zmeny"]
+
+        # Jeden request: konec listu Tipy + konec logu změn
+        resp = ws_tipy.spreadsheet.values_batch_get([
+            _tail_range(ws_tipy.title, n_tips, "E"),
+            _tail_range(ws_log.title, n_log, "F"),
+        ], params=_read_params())
+        tip_values, log_values = [vr.get('values', []) for vr in resp['valueRanges']]
+
+        changes = {}
+        if n_tips:
+            # Klíč kontrolního řádku musí sedět, jinak se list mezitím přeskládal
+            # (změnu samotného tipu na tomto řádku přinese log změn)
+            if not tip_values or _tip_key(_to_record(tip_cols, tip_values[0])) != _tip_key(last_row):
+                return None
+            tip_values = tip_values[1:]
+        for i, row in enumerate(tip_values):
+            changes[n_tips + i] = _to_record(tip_cols, row)
+
+        if n_log:
+            log_values = log_values[1:]
+        for row in log_values:
+            entry = _to_record(log_cols, row)
+            if entry["Radek"] == LOG_REWRITE_MARK:
+                # Jiný proces list přepsal (compact_tips) - snapshot i index se musí načíst znovu
+                self._tips_index.ready = False
+                return None
+            changes[int(entry["Radek"]) - 2] = {c: entry[c] for c in tip_cols}
+
+        self._tips_index.apply(changes)
+        return changes, (n_tips + len(tip_values), n_log + len(log_values))
+
+    def save_tips(self, user_email: str, tips: dict):
+        self.save_tips_bulk({user_email: tips})
+
+    def _refresh_tips_index(self, ws_tipy, keys=()):
+        """
+        Levná kontrola indexu před zápisem (jeden request, jen sloupce A:B):
+        konec listu od posledního známého řádku a klíče v rozsahu řádků, kam se bude zapisovat
+        (jeden rozsah od prvního po poslední cílový řádek - URL zůstane krátká i pro stovky tipů).
+        Když poslední známý řádek nebo některý cílový řádek nesedí (list se přeskládal),
+        index se postaví znovu - zápis nikdy nejde na cizí řádek podle starého čísla.
+        """
+        index = self._tips_index
+        if index.ready:
+            n = len(index.keys)
+            targets = sorted({index.rows[k] for k in keys if k in index.rows})
+            ranges = [_tail_range(ws_tipy.title, n, "B")]
+            if targets:
+                ranges.append(absolute_range_name(ws_tipy.title, f"A{targets[0]}:B{targets[-1]}"))
+            resp = ws_tipy.spreadsheet.values_batch_get(ranges, params=_read_params())['valueRanges']
+            tail_keys = [_tip_key(_to_record(["Email", "Zapas_ID"], row)) for row in resp[0].get('values', [])]
+            span = resp[1].get('values', []) if targets else []
+            targets_ok = all(
+                _tip_key(_to_record(["Email", "Zapas_ID"], span[row - targets[0]] if row - targets[0] < len(span) else []))
+                == index.keys[row - 2]
+                for row in targets
+            )
+            if targets_ok and not n:
+                index.extend(tail_keys)
+                return
+            if targets_ok and tail_keys and tail_keys[0] == index.keys[-1]:
+                index.extend(tail_keys[1:])
+                return
+
+        # Plné postavení indexu (jen klíčové sloupce)
+        values = ws_tipy.spreadsheet.values_get(absolute_range_name(ws_tipy.title, "A:B"), params=_read_params()).get('values', [])
+        index.rebuild([_tip_key(_to_record(["Email", "Zapas_ID"], row)) for row in values[1:]])
+
+    def save_tips_bulk(self, tips_by_user: dict):
+        ws_tipy = self._worksheet("Tipy")
+        ws_log = get_tips_log_worksheet()
+        index = self._tips_index
+
+        with index.lock:
+            keys = [(str(e), str(zid)) for e, tips in tips_by_user.items() for zid in tips]
+            # Před zápisem podle čísel řádků vždy ověříme, že index odpovídá listu
+            self._refresh_tips_index(ws_tipy, keys)
+
+            requests = []
+            new_rows = []
+            log_rows = []
+
+            for user_email, tips in tips_by_user.items():
+                for zid, (d, h, ot) in tips.items():
+                    key = (str(user_email), str(zid))
+
+                    if key in index.rows:
+                        # UPDATE existujícího řádku (sloupce Tip_Domaci..Tip_Prodlouzeni)
+                        row_idx = index.rows[key]
+                        requests.append({"updateCells": {
+                            "rows": [_row_data([d, h, ot])],
+                            "fields": "userEnteredValue",
+                            "start": {"sheetId": ws_tipy.id, "rowIndex": row_idx - 1, "columnIndex": COL_TIP_DOMACI - 1},
+                        }})
+                        log_rows.append([row_idx, user_email, zid, d, h, ot])
+                    else:
+                        # INSERT nového řádku
+                        new_rows.append([user_email, zid, d, h, ot])
+
+            if new_rows:
+                requests.append({"appendCells": {
+                    "sheetId": ws_tipy.id, "rows": [_row_data(r) for r in new_rows], "fields": "userEnteredValue"
+                }})
+            # Změněné řádky zapíšeme do logu, aby si je ostatní stáhli bez celého listu
+            if log_rows:
+                requests.append({"appendCells": {
+                    "sheetId": ws_log.id, "rows": [_row_data(r) for r in log_rows], "fields": "userEnteredValue"
+                }})
+
+            # Jediný (atomický) zápis za všechny hráče
+            if requests:
+                ws_tipy.spreadsheet.batch_update({"requests": requests})
+
+    def compact_tips(self) -> int:
+        """
+        Jedním batch_update přepíše list Tipy bez duplicit a do logu změn připíše
+        značku LOG_REWRITE_MARK (čísla řádků před ní neplatí). Log se nikdy nemaže,
+        kurzory ostatních procesů tak zůstávají platné: na značku narazí při příští
+        delta synchronizaci a načtou list celý. Jejich zápisy tipů jsou chráněné
+        kontrolou cílových řádků (_refresh_tips_index). Tip, který jiný proces připsal
+        mezi čtením a zápisem, vrátí jeho deník do fronty (reconcile).
+        """
+        ws_tipy = self._worksheet("Tipy")
+        ws_log = get_tips_log_worksheet()
+        index = self._tips_index
+
+        # Zámek indexu drží odesílání tipů tohoto procesu, dokud se list nepřepíše
+        with index.lock:
+            tip_values = ws_tipy.spreadsheet.values_get(absolute_range_name(ws_tipy.title), params=_read_params()).get('values', [])
+            if len(tip_values) < 2:
+                return 0
+            header, rows = tip_values[0], tip_values[1:]
+
+            # Stejné pravidlo jako při načtení: poslední řádek vyhrává, pořadí podle prvního výskytu
+            unique = {}
+            for row in rows:
+                unique[_tip_key(_to_record(header, row))] = row
+            removed = len(rows) - len(unique)
+            if not removed:
+                return 0
+
+            width = len(header)
+            ws_tipy.spreadsheet.batch_update({"requests": [
+                {"updateCells": {
+                    "rows": [{"values": [_cell_data(v) for v in row] + [{}] * (width - len(row))} for row in unique.values()],
+                    "fields": "userEnteredValue",
+                    "start": {"sheetId": ws_tipy.id, "rowIndex": 1, "columnIndex": 0},
+                }},
+                # Zbytek listu (řádky navíc) vyčistíme
+                {"updateCells": {
+                    "range": {"sheetId": ws_tipy.id, "startRowIndex": len(unique) + 1},
+                    "fields": "userEnteredValue",
+                }},
+                {"appendCells": {
+                    "sheetId": ws_log.id,
+                    "rows": [_row_data([LOG_REWRITE_MARK, datetime.now().isoformat(timespec="seconds")])],
+                    "fields": "userEnteredValue",
+                }},
+            ]})
+            index.rebuild(list(unique))
+        return removed
+
+    def update_user(self, user_idx: int, fields: dict):
+        ws_users = self._worksheet("Uzivatele")
+        row_idx = user_idx + 2
+        updates = [gspread.Cell(row_idx, _col("Uzivatele", k), v) for k, v in fields.items()]
+        ws_users.update_cells(updates)
+
+    def append_user(self, row: list):
+        self._worksheet("Uzivatele").append_row(row)
+
+    def append_chat(self, row: list):
+        self._worksheet("Chat").append_row(row)
+
+    def save_match_results(self, results: dict) -> list:
+        ws_zapasy = self._worksheet("Zapasy")
+        # Jedno čtení sloupce ID pro všechny zápasy
+        row_of = {}
+        for i, zid in enumerate(ws_zapasy.col_values(1)):
+            row_of.setdefault(zid, i + 1)
+
+        data = []
+        missing = []
+        for match_id, (score_home, score_away, overtime) in results.items():
+            row_idx = row_of.get(str(match_id))
+            if row_idx is None:
+                missing.append(match_id)
+                continue
+            # Skóre jsou vedle sebe, Prodlouzeni je za sloupcem Faze
+            score_range = rowcol_to_a1(row_idx, _col("Zapasy", "Skore_Domaci")) + ":" + rowcol_to_a1(row_idx, _col("Zapasy", "Skore_Hoste"))
+            data.append({"range": absolute_range_name(ws_zapasy.title, score_range), "values": [[score_home, score_away]]})
+            data.append({"range": absolute_range_name(ws_zapasy.title, rowcol_to_a1(row_idx, _col("Zapasy", "Prodlouzeni"))), "values": [[overtime]]})
+
+        # Jeden zápis za všechny zápasy
+        if data:
+            ws_zapasy.spreadsheet.values_batch_update({"valueInputOption": "USER_ENTERED", "data": data})
+        return missing
+
+    def set_config(self, key: str, value):
+        ws_nastaveni = _get_or_create_worksheet("Nastaveni", rows=100)
+
+        c = ws_nastaveni.find(key)
+        if c:
+            ws_nastaveni.update_cell(c.row, 2, value)
+        else:
+            ws_nastaveni.append_row([key, value])
+
+    def create_reset_request(self, email: str):
+        # Pokud list neexistuje, vytvoříme ho (bezpečnostní pojistka)
+        ws_reset = _get_or_create_worksheet("Reset")
+
+        # Zápis požadavku
+        ws_reset.append_row([email, str(datetime.now()), "PENDING"])
@@ -0,0 +1,42 @@
+"""
+Snapshot datasetů na disku
+Každé úspěšné načtení datasetu se uloží do souboru. Po restartu serveru se
+data hned zobrazí ze snapshotu (a na pozadí se načtou čerstvá), při výpadku
+nebo limitu úložiště slouží snapshot jako záloha místo chybové hlášky.
+"""
+
+import os
+import pickle
+import threading
+
+from utils.config import SNAPSHOT_DIR
+
+_lock = threading.Lock()
+
+
+def _path(name: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{name}.pkl")
+
+
+def write_snapshot(name: str, data):
+    """Atomicky přepíše snapshot datasetu (chyba zápisu aplikaci neshodí)."""
+    path = _path(name)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with _lock:
+            os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def read_snapshot(name: str):
+    """Vrátí data ze snapshotu, nebo None (chybí / nejde přečíst)."""
+    try:
+        with _lock, open(_path(name), "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
@@ -0,0 +1,245 @@
+"""
+Úložiště - lokální SQLite databáze
+Stejné listy a sloupce jako v Google Sheetu, jen s indexy a bez API limitů.
+
+Převod dat z Google Sheets:
+    python -m data.sqlite_storage [cesta_k_db]
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+
+from data.storage import StorageBackend
+from utils.config import SHEET_COLUMNS
+
+# Indexy pro rychlé dotazy (název -> (list, sloupce, unikátní?))
+INDEXES = {
+    "idx_zapasy_id": ("Zapasy", ["ID"], True),
+    "idx_tipy_email_zapas": ("Tipy", ["Email", "Zapas_ID"], True),
+    "idx_uzivatele_email": ("Uzivatele", ["Email"], False),
+    "idx_nastaveni_klic": ("Nastaveni", ["Klic"], True),
+}
+
+
+def _q(name: str) -> str:
+    """Ocituje identifikátor pro SQL."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SqliteStorage(StorageBackend):
+    """
+    Úložiště nad SQLite.
+    Sloupce nemají deklarovaný typ, hodnoty se ukládají tak, jak přišly
+    (čísla jako čísla, texty jako texty) - chování odpovídá get_all_records.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            for sheet, cols in SHEET_COLUMNS.items():
+                col_sql = ", ".join(_q(c) for c in cols)
+                self._conn.execute(f"CREATE TABLE IF NOT EXISTS {_q(sheet)} ({col_sql})")
+            for name, (sheet, cols, unique) in INDEXES.items():
+                col_sql = ", ".join(_q(c) for c in cols)
+                kind = "UNIQUE INDEX" if unique else "INDEX"
+                self._conn.execute(f"CREATE {kind} IF NOT EXISTS {_q(name)} ON {_q(sheet)} ({col_sql})")
+            # Každá změna tipu se zapíše do logu změn (stejně jako list Tipy_Zmeny v Google Sheets);
+            # znovu uložený stejný tip se nezapisuje. Trigger se vytváří znovu kvůli starším databázím.
+            self._conn.execute('DROP TRIGGER IF EXISTS "trg_tipy_zmeny"')
+            self._conn.execute(
+                'CREATE TRIGGER "trg_tipy_zmeny" AFTER UPDATE ON "Tipy" '
+                'WHEN OLD."Email" IS NOT NEW."Email" OR OLD."Zapas_ID" IS NOT NEW."Zapas_ID" '
+                'OR OLD."Tip_Domaci" IS NOT NEW."Tip_Domaci" OR OLD."Tip_Hoste" IS NOT NEW."Tip_Hoste" '
+                'OR OLD."Tip_Prodlouzeni" IS NOT NEW."Tip_Prodlouzeni" BEGIN '
+                'INSERT INTO "Tipy_Zmeny" ("Radek", "Email", "Zapas_ID", "Tip_Domaci", "Tip_Hoste", "Tip_Prodlouzeni") '
+                'VALUES (NEW.rowid + 1, NEW."Email", NEW."Zapas_ID", NEW."Tip_Domaci", NEW."Tip_Hoste", NEW."Tip_Prodlouzeni"); '
+                'END'
+            )
+
+    def _insert(self, sheet: str, row: list):
+        cols = SHEET_COLUMNS[sheet]
+        # Doplnění/oříznutí na počet sloupců listu
+        values = (list(row) + [""] * len(cols))[:len(cols)]
+        placeholders = ", ".join("?" for _ in cols)
+        col_sql = ", ".join(_q(c) for c in cols)
+        self._conn.execute(f"INSERT INTO {_q(sheet)} ({col_sql}) VALUES ({placeholders})", values)
+
+    def load_records(self, sheet: str) -> list:
+        cols = SHEET_COLUMNS[sheet]
+        col_sql = ", ".join(_q(c) for c in cols)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {col_sql} FROM {_q(sheet)} ORDER BY rowid").fetchall()
+        return [{c: ("" if v is None else v) for c, v in zip(cols, r)} for r in rows]
+
+    def load_tail(self, sheet: str, count: int) -> tuple:
+        cols = SHEET_COLUMNS[sheet]
+        col_sql = ", ".join(_q(c) for c in cols)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM {_q(sheet)}").fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {col_sql} FROM {_q(sheet)} ORDER BY rowid DESC LIMIT ?", (count,)
+            ).fetchall()
+        return [{c: ("" if v is None else v) for c, v in zip(cols, r)} for r in reversed(rows)], total
+
+    def load_range(self, sheet: str, start: int, stop: int) -> list:
+        cols = SHEET_COLUMNS[sheet]
+        col_sql = ", ".join(_q(c) for c in cols)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {col_sql} FROM {_q(sheet)} ORDER BY rowid LIMIT ? OFFSET ?", (max(stop - start, 0), start)
+            ).fetchall()
+        return [{c: ("" if v is None else v) for c, v in zip(cols, r)} for r in rows]
+
+    def _tip_rows(self, where: str, params: tuple) -> list:
+        cols = SHEET_COLUMNS["Tipy"]
+        col_sql = ", ".join(_q(c) for c in cols)
+        rows = self._conn.execute(
+            f'SELECT rowid, {col_sql} FROM "Tipy" WHERE {where} ORDER BY rowid', params
+        ).fetchall()
+        return [(r[0], {c: ("" if v is None else v) for c, v in zip(cols, r[1:])}) for r in rows]
+
+    def load_tips_full(self) -> tuple:
+        with self._lock:
+            rows = self._tip_rows("1", ())
+            log_rev = self._conn.execute('SELECT COALESCE(MAX(rowid), 0) FROM "Tipy_Zmeny"').fetchone()[0]
+        # Index řádku = rowid - 1; pokud v rowid jsou díry (ruční mazání), delta nejde použít
+        if rows and rows[-1][0] != len(rows):
+            return [r for _, r in rows], None
+        return [r for _, r in rows], (len(rows), log_rev)
+
+    def load_tips_delta(self, cursor, last_row: dict):
+        n_tips, log_rev = cursor
+        cols = SHEET_COLUMNS["Tipy"]
+        with self._lock, self._conn:
+            rows = self._tip_rows("rowid >= ?", (max(n_tips, 1),))
+            first_log = self._conn.execute('SELECT MIN(rowid) FROM "Tipy_Zmeny"').fetchone()[0]
+            # Záznamy za kurzorem už byly z logu smazané - delta nejde použít
+            if first_log is not None and first_log > log_rev + 1:
+                return None
+            log = self._conn.execute(
+                'SELECT rowid, "Radek", ' + ", ".join(_q(c) for c in cols) +
+                ' FROM "Tipy_Zmeny" WHERE rowid > ? ORDER BY rowid', (log_rev,)
+            ).fetchall()
+            if log:
+                # Načtené záznamy už nejsou potřeba; poslední zůstává, aby se rowid logu nezačalo opakovat
+                self._conn.execute('DELETE FROM "Tipy_Zmeny" WHERE rowid < ?', (log[-1][0],))
+
+        changes = {}
+        if n_tips:
+            # Klíč kontrolního řádku musí sedět, jinak se tabulka mezitím přeskládala
+            # (změnu samotného tipu na tomto řádku přinese log změn)
+            key = (str(last_row.get("Email", "")), str(last_row.get("Zapas_ID", "")))
+            if not rows or rows[0][0] != n_tips or (str(rows[0][1]["Email"]), str(rows[0][1]["Zapas_ID"])) != key:
+                return None
+            rows = rows[1:]
+        for rowid, record in rows:
+            changes[rowid - 1] = record
+        for entry in log:
+            changes[entry[1] - 2] = {c: ("" if v is None else v) for c, v in zip(cols, entry[2:])}
+
+        new_rev = log[-1][0] if log else log_rev
+        return changes, (n_tips + len(rows), new_rev)
+
+    def save_tips(self, user_email: str, tips: dict):
+        rows = [(user_email, str(zid), d, h, ot) for zid, (d, h, ot) in tips.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO "Tipy" ("Email", "Zapas_ID", "Tip_Domaci", "Tip_Hoste", "Tip_Prodlouzeni") '
+                'VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT ("Email", "Zapas_ID") DO UPDATE SET '
+                '"Tip_Domaci" = excluded."Tip_Domaci", '
+                '"Tip_Hoste" = excluded."Tip_Hoste", '
+                '"Tip_Prodlouzeni" = excluded."Tip_Prodlouzeni"',
+                rows
+            )
+
+    def update_user(self, user_idx: int, fields: dict):
+        cols = SHEET_COLUMNS["Uzivatele"]
+        set_sql = ", ".join(f"{_q(k)} = ?" for k in fields if k in cols)
+        values = [v for k, v in fields.items() if k in cols]
+        if not values:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'UPDATE "Uzivatele" SET {set_sql} '
+                'WHERE rowid = (SELECT rowid FROM "Uzivatele" ORDER BY rowid LIMIT 1 OFFSET ?)',
+                values + [user_idx]
+            )
+
+    def append_user(self, row: list):
+        with self._lock, self._conn:
+            self._insert("Uzivatele", row)
+
+    def append_chat(self, row: list):
+        with self._lock, self._conn:
+            self._insert("Chat", row)
+
+    def save_match_results(self, results: dict) -> list:
+        missing = []
+        with self._lock, self._conn:
+            for match_id, (score_home, score_away, overtime) in results.items():
+                cur = self._conn.execute(
+                    'UPDATE "Zapasy" SET "Skore_Domaci" = ?, "Skore_Hoste" = ?, "Prodlouzeni" = ? '
+                    'WHERE CAST("ID" AS TEXT) = ?',
+                    (score_home, score_away, overtime, str(match_id))
+                )
+                if cur.rowcount == 0:
+                    missing.append(match_id)
+        return missing
+
+    def set_config(self, key: str, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO "Nastaveni" ("Klic", "Hodnota") VALUES (?, ?) '
+                'ON CONFLICT ("Klic") DO UPDATE SET "Hodnota" = excluded."Hodnota"',
+                (key, value)
+            )
+
+    def create_reset_request(self, email: str):
+        with self._lock, self._conn:
+            self._insert("Reset", [email, str(datetime.now()), "PENDING"])
+
+    def import_records(self, sheet: str, records: list):
+        """
+        Nahradí obsah listu zadanými záznamy (pro převod z Google Sheets).
+        U Tipů se duplicitní (Email, Zapas_ID) sloučí - vyhrává poslední řádek.
+        """
+        cols = SHEET_COLUMNS[sheet]
+        verb = "INSERT OR REPLACE" if sheet in ("Tipy", "Nastaveni") else "INSERT"
+        placeholders = ", ".join("?" for _ in cols)
+        col_sql = ", ".join(_q(c) for c in cols)
+        rows = [[r.get(c, "") for c in cols] for r in records]
+        if sheet == "Tipy":
+            # Klíč (Email, Zapas_ID) držíme jako text, stejně jako save_tips
+            rows = [[str(r[0]), str(r[1])] + r[2:] for r in rows]
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {_q(sheet)}")
+            if sheet == "Tipy":
+                self._conn.execute('DELETE FROM "Tipy_Zmeny"')
+            self._conn.executemany(f"{verb} INTO {_q(sheet)} ({col_sql}) VALUES ({placeholders})", rows)
+
+
+def import_from_sheets(path: str):
+    """Zkopíruje všechna data z Google Sheets do SQLite souboru."""
+    from data.sheets_storage import SheetsStorage
+
+    source = SheetsStorage()
+    target = SqliteStorage(path)
+    for sheet in ("Zapasy", "Tipy", "Uzivatele", "Chat", "Nastaveni"):
+        records = source.load_records(sheet)
+        target.import_records(sheet, records)
+        print(f"{sheet}: {len(records)} řádků")
+
+
+if __name__ == "__main__":
+    import sys
+    from utils.config import SQLITE_PATH
+
+    import_from_sheets(sys.argv[1] if len(sys.argv) > 1 else SQLITE_PATH)
@@ -0,0 +1,160 @@
+"""
+Rozhraní úložiště dat
+Aplikace nemluví přímo s gspread ani s SQLite, ale s objektem StorageBackend.
+Konkrétní implementace: Google Sheets (sheets_storage) a SQLite (sqlite_storage).
+"""
+
+from abc import ABC, abstractmethod
+
+import streamlit as st
+
+from utils.config import STORAGE_BACKEND, SQLITE_PATH
+
+
+class StorageBackend(ABC):
+    """
+    Společné rozhraní pro všechna úložiště.
+
+    Listy (tabulky) se jmenují stejně jako v Google Sheetu:
+    Zapasy, Tipy, Uzivatele, Chat, Nastaveni, Reset.
+    Záznamy se vrací jako slovníky {název sloupce: hodnota},
+    prázdná buňka je prázdný string (stejně jako get_all_records).
+    """
+
+    @abstractmethod
+    def load_records(self, sheet: str) -> list:
+        """Vrátí všechny řádky listu jako seznam slovníků (v pořadí řádků)."""
+
+    def load_tail(self, sheet: str, count: int) -> tuple:
+        """
+        Načte jen posledních count řádků listu (např. nejnovější zprávy chatu).
+
+        Returns:
+            (záznamy v pořadí řádků, celkový počet řádků listu)
+        """
+        records = self.load_records(sheet)
+        return records[-count:] if count else [], len(records)
+
+    def load_range(self, sheet: str, start: int, stop: int) -> list:
+        """Načte řádky start..stop-1 (0 = první datový řádek)."""
+        return self.load_records(sheet)[start:stop]
+
+    def prefetch(self, sheets: list):
+        """
+        Nápověda, že se budou načítat zadané listy - úložiště je může stáhnout
+        najednou (jeden request) a následné load_records je vrátí bez dalšího čtení.
+        """
+
+    def load_tips_full(self) -> tuple:
+        """
+        Plné načtení listu Tipy pro synchronizaci (viz data/sync.py).
+
+        Returns:
+            (records, cursor) - cursor None znamená, že úložiště neumí delta načítání
+        """
+        return self.load_records("Tipy"), None
+
+    def load_tips_delta(self, cursor, last_row: dict):
+        """
+        Načte jen tipy přidané nebo změněné od posledního kurzoru.
+
+        Args:
+            cursor: Kurzor z předchozího načtení (počet řádků + značka změn)
+            last_row: Poslední známý řádek (kontrola klíče Email + Zapas_ID, že se list mezitím
+                nepřeskládal; změny hodnot tipu na něm pokrývá log změn)
+
+        Returns:
+            ({index řádku: záznam}, nový kurzor), nebo None když je nutné plné načtení
+        """
+        return None
+
+    @abstractmethod
+    def save_tips(self, user_email: str, tips: dict):
+        """
+        Uloží tipy jednoho uživatele (update existujících, insert nových).
+
+        Args:
+            user_email: Email uživatele
+            tips: {match_id: (home, away, ot)} - už zvalidované hodnoty
+        """
+
+    def save_tips_bulk(self, tips_by_user: dict):
+        """
+        Uloží tipy více hráčů najednou (dávka z deníku tipů).
+
+        Args:
+            tips_by_user: {email: {match_id: (home, away, ot)}}
+        """
+        for user_email, tips in tips_by_user.items():
+            self.save_tips(user_email, tips)
+
+    def compact_tips(self) -> int:
+        """
+        Přepíše list Tipy bez duplicitních (Email, Zapas_ID) jedním zápisem (viz data/store.dedup_tips).
+        Výchozí úložiště duplicity nedovolí (unikátní index), takže není co slučovat.
+
+        Returns:
+            Počet odstraněných řádků
+        """
+        return 0
+
+    @abstractmethod
+    def update_user(self, user_idx: int, fields: dict):
+        """
+        Přepíše vybrané sloupce uživatele.
+
+        Args:
+            user_idx: Pořadí uživatele v načteném seznamu (0 = první datový řádek)
+            fields: {název sloupce: nová hodnota}
+        """
+
+    @abstractmethod
+    def append_user(self, row: list):
+        """Přidá nového uživatele (řádek v pořadí SHEET_COLUMNS['Uzivatele'])."""
+
+    @abstractmethod
+    def append_chat(self, row: list):
+        """Přidá zprávu do chatu ([Datum, Hrac, Zprava])."""
+
+    @abstractmethod
+    def save_match_results(self, results: dict) -> list:
+        """
+        Zapíše výsledky více zápasů najednou (jeden zápis).
+
+        Args:
+            results: {match_id: (score_home, score_away, overtime)}
+
+        Returns:
+            Seznam ID zápasů, které neexistují (ty se nezapíšou)
+        """
+
+    def save_match_result(self, match_id, score_home, score_away, overtime) -> bool:
+        """
+        Zapíše výsledek zápasu.
+
+        Returns:
+            False pokud zápas s daným ID neexistuje
+        """
+        return not self.save_match_results({match_id: (score_home, score_away, overtime)})
+
+    @abstractmethod
+    def set_config(self, key: str, value):
+        """Nastaví hodnotu v listu Nastaveni (update nebo insert)."""
+
+    @abstractmethod
+    def create_reset_request(self, email: str):
+        """Zapíše požadavek na reset hesla do listu Reset."""
+
+
+@st.cache_resource
+def get_storage() -> StorageBackend:
+    """
+    Vrátí instanci úložiště podle konfigurace (TIPOVACKA_STORAGE).
+    Drží se po celou dobu běhu procesu.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        from data.sqlite_storage import SqliteStorage
+        return SqliteStorage(SQLITE_PATH)
+
+    from data.sheets_storage import SheetsStorage
+    return SheetsStorage()
@@ -0,0 +1,236 @@
+"""
+Typované sloupcové tabulky zápasů a tipů (+ stránka chatu)
+Hodnoty z listu se převedou jednou při načtení (na verzi datasetu), ne při každém
+překreslení stránky. Tabulka se dál chová jako seznam slovníků (iterace, z['ID'],
+t.get('Tip_Prodlouzeni')), navíc nese NumPy sloupce pro hromadné výpočty.
+"""
+
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+
+from utils.config import TIMEZONE, PLAYOFF_KEYWORDS, STATS_PLAYOFF_KEYWORDS, CZECH_TEAM_KEYWORDS
+
+# Chybějící nebo neplatné číslo v celočíselném sloupci
+NO_VALUE = -1
+
+# Rozsah celočíselných sloupců (int16) - větší číslo z listu je neplatná hodnota
+_INT_MIN, _INT_MAX = int(np.iinfo(np.int16).min), int(np.iinfo(np.int16).max)
+
+
+def _to_int(value):
+    """Převede hodnotu z listu na int (3, '3', 3.0), jinak None (i mimo rozsah sloupců)."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = int(value)
+    except (ValueError, TypeError):
+        try:
+            number = int(float(value))
+        except (ValueError, TypeError, OverflowError):
+            return None
+    return number if _INT_MIN <= number <= _INT_MAX else None
+
+
+def _col_int(value) -> int:
+    """Hodnota pro celočíselný sloupec (už převedená na int v rozsahu, jinak NO_VALUE)."""
+    if isinstance(value, int) and not isinstance(value, bool) and _INT_MIN <= value <= _INT_MAX:
+        return value
+    return NO_VALUE
+
+
+def _is_yes(value) -> bool:
+    return str(value).strip().upper() == "ANO"
+
+
+def match_flags(faze, team_d, team_h) -> tuple:
+    """Příznaky zápasu podle fáze a týmů: (is_playoff, is_stats_playoff, has_czech)."""
+    faze_lower = str(faze).lower()
+    teams = (str(team_d) + " " + str(team_h)).lower()
+    return (
+        any(x in faze_lower for x in PLAYOFF_KEYWORDS),
+        any(x in faze_lower for x in STATS_PLAYOFF_KEYWORDS),
+        any(x in teams for x in CZECH_TEAM_KEYWORDS),
+    )
+
+
+def _aware(dt):
+    """Čas výkopu s časovou zónou (naivní datum z úložiště = pražský čas)."""
+    if dt is None or dt.tzinfo is not None:
+        return dt
+    return TIMEZONE.localize(dt)
+
+
+def dedup_tips(records: list) -> list:
+    """
+    Sloučí duplicitní tipy (Email, Zapas_ID).
+    Platí hodnoty z posledního řádku (poslední uložení), pořadí podle prvního výskytu.
+    """
+    unique = {}
+    for t in records:
+        unique[(str(t['Email']), str(t['Zapas_ID']))] = t
+    return list(unique.values()) if len(unique) < len(records) else list(records)
+
+
+class MatchTable(list):
+    """
+    Zápasy jako seznam slovníků + sloupce.
+
+    Řádky: ID je text, Skore_Domaci/Skore_Hoste jsou int u odehraných zápasů
+    (u neodehraných zůstává ""), is_finished je bool, Datum_Obj datetime.
+
+    Sloupce (stejné pořadí jako řádky):
+        ids, score_home, score_away (NO_VALUE = bez výsledku), is_finished,
+        overtime, kickoff (datetime s časovou zónou nebo None), phase (malými písmeny),
+        is_playoff (playoff násobič), is_stats_playoff (playoff ve statistikách), has_czech
+
+    Rozpis (spočítá se jednou při načtení, viz _build_schedule):
+        days: seřazené dny výkopů, match_day: index dne u každého zápasu (-1 = bez data),
+        day_matches: pozice zápasů po dnech, schedule: pozice zápasů s datem podle výkopu
+        (stabilně), schedule_kickoffs: jejich výkopy - hledání bisectem (locked, upcoming)
+
+    loaded_at: čas načtení z úložiště (verze dat pro cache výpočtů, None = neznámá)
+    """
+
+    loaded_at = None
+
+    def __init__(self, records: list, loaded_at=None):
+        self.loaded_at = loaded_at
+        rows = []
+        for z in records:
+            row = dict(z)
+            row['ID'] = str(z['ID'])
+            home, away = _to_int(z.get('Skore_Domaci')), _to_int(z.get('Skore_Hoste'))
+            row['is_finished'] = str(z.get('Skore_Domaci', '')) != "" and home is not None and away is not None
+            if row['is_finished']:
+                row['Skore_Domaci'], row['Skore_Hoste'] = home, away
+            rows.append(row)
+        super().__init__(rows)
+
+        self.ids = np.array([r['ID'] for r in rows], dtype=object)
+        self.position = {zid: i for i, zid in enumerate(self.ids)}
+        self.is_finished = np.array([r['is_finished'] for r in rows], dtype=bool)
+        self.score_home = np.array([r['Skore_Domaci'] if r['is_finished'] else NO_VALUE for r in rows], dtype=np.int16)
+        self.score_away = np.array([r['Skore_Hoste'] if r['is_finished'] else NO_VALUE for r in rows], dtype=np.int16)
+        self.overtime = np.array([_is_yes(r.get('Prodlouzeni', '')) for r in rows], dtype=bool)
+        self.kickoff = np.array([_aware(r.get('Datum_Obj')) for r in rows], dtype=object)
+        self.phase = np.array([str(r.get('Faze', '')).lower() for r in rows], dtype=object)
+        self._build_schedule()
+
+    def _build_schedule(self):
+        flags = [match_flags(r.get('Faze', ''), r['Domaci'], r['Hoste']) for r in self]
+        self.is_playoff = np.array([f[0] for f in flags], dtype=bool)
+        self.is_stats_playoff = np.array([f[1] for f in flags], dtype=bool)
+        self.has_czech = np.array([f[2] for f in flags], dtype=bool)
+
+        kick_days = [k.date() if k else None for k in self.kickoff]
+        self.days = sorted({d for d in kick_days if d is not None})
+        day_code = {d: i for i, d in enumerate(self.days)}
+        self.match_day = np.array([day_code.get(d, -1) for d in kick_days], dtype=np.int64)
+        self.day_matches = [[] for _ in self.days]
+        for pos, code in enumerate(self.match_day.tolist()):
+            if code >= 0:
+                self.day_matches[code].append(pos)
+
+        dated = [pos for pos, k in enumerate(self.kickoff) if k is not None]
+        self.schedule = np.array(sorted(dated, key=lambda pos: self.kickoff[pos]), dtype=np.int64)
+        self.schedule_kickoffs = [self.kickoff[pos] for pos in self.schedule]
+
+    def __setstate__(self, state):
+        # Snapshot ze starší verze aplikace nemá rozpis - dopočítá se
+        self.__dict__.update(state)
+        if 'schedule' not in state:
+            self.kickoff = np.array([_aware(k) for k in self.kickoff], dtype=object)
+            self._build_schedule()
+
+    def locked(self, now) -> np.ndarray:
+        """Zápasy, které už začaly (výkop před now) - bool pole v pořadí zápasů."""
+        started = np.zeros(len(self), dtype=bool)
+        started[self.schedule[:bisect_left(self.schedule_kickoffs, now)]] = True
+        return started
+
+    def upcoming(self, now):
+        """Pozice nejbližšího neodehraného zápasu s výkopem po now (nebo None)."""
+        for pos in self.schedule[bisect_right(self.schedule_kickoffs, now):].tolist():
+            if not self.is_finished[pos]:
+                return pos
+        return None
+
+    def by_id(self, match_id):
+        """Vrátí zápas podle ID (nebo None)."""
+        pos = self.position.get(str(match_id))
+        return None if pos is None else self[pos]
+
+
+class TipTable(list):
+    """
+    Tipy jako seznam slovníků + sloupce.
+
+    Řádky: Email a Zapas_ID jsou text, Tip_Domaci/Tip_Hoste int, každá dvojice
+    (Email, Zapas_ID) jen jednou - viz dedup_tips, duplicates = počet sloučených řádků.
+
+    Sloupce (stejné pořadí jako řádky):
+        email_codes -> emails, match_codes -> match_ids (kategorie jako kódy),
+        home, away (NO_VALUE = neplatný tip), overtime (tip na prodloužení)
+
+    loaded_at: čas načtení z úložiště (verze dat pro cache výpočtů, None = neznámá)
+    """
+
+    duplicates = 0
+    loaded_at = None
+
+    def __init__(self, records: list, loaded_at=None):
+        self.loaded_at = loaded_at
+        unique = dedup_tips(records)
+        self.duplicates = len(records) - len(unique)
+        rows = []
+        for t in unique:
+            row = dict(t)
+            row['Email'] = str(t['Email'])
+            row['Zapas_ID'] = str(t['Zapas_ID'])
+            for col in ('Tip_Domaci', 'Tip_Hoste'):
+                value = _to_int(t.get(col))
+                if value is not None:
+                    row[col] = value
+            rows.append(row)
+        super().__init__(rows)
+
+        self.email_codes, self.emails = pd.factorize(pd.Series([r['Email'] for r in rows], dtype=object))
+        self.match_codes, self.match_ids = pd.factorize(pd.Series([r['Zapas_ID'] for r in rows], dtype=object))
+        self.match_index = {zid: code for code, zid in enumerate(self.match_ids)}
+        self.home = np.array([_col_int(r.get('Tip_Domaci')) for r in rows], dtype=np.int16)
+        self.away = np.array([_col_int(r.get('Tip_Hoste')) for r in rows], dtype=np.int16)
+        self.overtime = np.array([_is_yes(r.get('Tip_Prodlouzeni', '')) for r in rows], dtype=bool)
+
+    def match_crowd(self) -> tuple:
+        """
+        Kolik hráčů tipuje výhru domácích / hostů u každého zápasu (0:0 = nenatipováno, nepočítá se).
+
+        Returns:
+            (home_wins, away_wins, total) - pole indexovaná kódem zápasu (match_index)
+        """
+        valid = (self.home >= 0) & (self.away >= 0) & ~((self.home == 0) & (self.away == 0))
+        n = len(self.match_ids)
+        codes = self.match_codes[valid]
+        home, away = self.home[valid], self.away[valid]
+        return (
+            np.bincount(codes[home > away], minlength=n),
+            np.bincount(codes[away > home], minlength=n),
+            np.bincount(codes, minlength=n),
+        )
+
+
+class ChatLog(list):
+    """
+    Nejnovější zprávy chatu (ne celý list).
+
+    Atributy:
+        total: celkový počet zpráv v listu
+        start: pořadí první načtené zprávy v listu (0 = nejstarší zpráva)
+    """
+
+    def __init__(self, records: list, total: int):
+        super().__init__(records)
+        self.total = total
+        self.start = total - len(records)
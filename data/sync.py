@@ -0,0 +1,74 @@
+"""
+Inkrementální synchronizace listu Tipy
+Drží poslední snapshot tipů v paměti procesu a při každém obnovení
+stahuje jen řádky přidané na konec listu a řádky zapsané do logu změn.
+"""
+
+import threading
+import time
+
+import streamlit as st
+
+from data.storage import get_storage
+from utils.config import TIPS_FULL_RESYNC_SECONDS
+
+
+class TipsSync:
+    """
+    Snapshot listu Tipy + kurzor (počet řádků, značka posledních změn).
+    Plné načtení jen při startu, při nekonzistenci a jednou za TIPS_FULL_RESYNC_SECONDS
+    (pojistka pro ruční úpravy přímo v tabulce, které do logu změn nepíšou).
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.rows = []
+        self.cursor = None
+        self.last_full_sync = 0.0
+        self._lock = threading.Lock()
+
+    def _full_sync(self):
+        self.rows, self.cursor = self.storage.load_tips_full()
+        self.last_full_sync = time.time()
+
+    def _apply(self, changes: dict) -> bool:
+        """Zapracuje změny do snapshotu. False = v datech je díra, nutné plné načtení."""
+        for idx in sorted(changes):
+            if idx < len(self.rows):
+                self.rows[idx] = changes[idx]
+            elif idx == len(self.rows):
+                self.rows.append(changes[idx])
+            else:
+                return False
+        return True
+
+    def reset(self):
+        """Příští refresh načte list celý (např. po přepsání listu při slučování duplicit)."""
+        with self._lock:
+            self.cursor = None
+
+    def refresh(self) -> list:
+        """
+        Aktualizuje snapshot a vrátí jeho kopii (seznam záznamů v pořadí řádků).
+        """
+        with self._lock:
+            expired = time.time() - self.last_full_sync > TIPS_FULL_RESYNC_SECONDS
+            if self.cursor is None or expired:
+                self._full_sync()
+            else:
+                delta = self.storage.load_tips_delta(self.cursor, self.rows[-1] if self.rows else {})
+                if delta is None:
+                    self._full_sync()
+                else:
+                    changes, cursor = delta
+                    if self._apply(changes):
+                        self.cursor = cursor
+                    else:
+                        self._full_sync()
+            return list(self.rows)
+
+
+@st.cache_resource
+def get_tips_sync() -> TipsSync:
+    """Jeden synchronizační objekt na proces (sdílený všemi sessions)."""
+    return TipsSync(get_storage())
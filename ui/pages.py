@@ -5,44 +5,58 @@ KOMPLETNÍ verze - adaptováno z tipovačka_12.py
 
 import streamlit as st
 import pandas as pd
-import gspread
+import altair as alt
 import time
 import os
+import json
 from datetime import datetime, timedelta
 import pytz
 
 # Vlastní moduly
-from data.database import load_all_data, get_worksheets_resources, save_tips_batch
+from data.database import (
+    load_all_data, save_tips_batch, update_user_fields, update_user_password,
+    post_chat_message, save_match_results, validate_match_results, set_config_value,
+    load_chat_messages, compact_tips, unconfirmed_tips
+)
 from business.scoring import spocitej_body_zapas, get_all_teams, is_past_deadline, spocitej_dlouhodobe_body
+from business.standings import StandingsCache
+from business.simulation import compare_rules, rule_variants, rule_value, build_projection, results_key, ProjectionRunner
 from ui.components import get_team_label, get_flag
 from utils.config import (
     TIMEZONE, ENTRY_FEE, BANK_ACCOUNT, HISTORY_HOCKEY, HISTORY_FOOTBALL,
-    OFFICIAL_RESULTS, DEADLINE
+    OFFICIAL_RESULTS, DEADLINE, POINTS_CONFIG,
+    PROJECTION_SIMULATIONS, PROJECTION_CHUNK, PROJECTION_WORKERS
 )
 
 
-def get_user_points_at_date(users, tipy, zapasy, date_limit):
-    """Pomocná funkce pro výpočet bodů k určitému datu"""
-    match_points = {}
-    for u in users:
-        match_points[str(u['Email'])] = 0
-    
-    finished_before = [z for z in zapasy if str(z.get('Skore_Domaci', '')) != "" and z.get('Datum_Obj') and z['Datum_Obj'] < date_limit]
-    
-    for z in finished_before:
-        zid = z['ID']
-        for t in tipy:
-            if t['Zapas_ID'] == zid:
-                email = str(t['Email'])
-                p, _, _, _ = spocitej_body_zapas(
-                    t['Tip_Domaci'], t['Tip_Hoste'],
-                    z['Skore_Domaci'], z['Skore_Hoste'],
-                    z['Domaci'], z['Hoste'], z.get('Faze', ''),
-                    t.get('Tip_Prodlouzeni', ''), z.get('Prodlouzeni', '')
-                )
-                match_points[email] += p
-    
-    return match_points
+@st.cache_resource
+def get_standings_cache():
+    """Žebříček na aktuální verzi dat, sdílený všemi sessions procesu."""
+    return StandingsCache()
+
+@st.cache_resource
+def get_projection_runner():
+    """Projekce šancí na bednu (procesy na pozadí), výsledek platí do dalšího zadaného výsledku."""
+    return ProjectionRunner(PROJECTION_WORKERS)
+
+def save_admin_results(rows, zapasy):
+    """Zkontroluje a uloží hromadně zadané výsledky (admin). Při chybě neuloží nic."""
+    results, errors = validate_match_results(rows, zapasy)
+    if errors:
+        for e in errors: st.error(f"❌ {e}")
+        return
+    if not results:
+        st.info("Žádné změny k uložení.")
+        return
+    try:
+        missing = save_match_results(results)
+    except Exception as e:
+        st.error(f"Chyba: {e}")
+        return
+    if missing:
+        st.error(f"❌ Chyba: ID zápasů {', '.join(map(str, missing))} nenalezeno.")
+    else:
+        st.success(f"✅ Uloženo výsledků: {len(results)}"); time.sleep(1); st.rerun()
 
 def get_daily_message():
     """Vrátí kontextovou hlášku podle aktuálního data."""
@@ -82,7 +96,10 @@ def render_main_application():
     
     # === NAČTENÍ DAT ===
     zapasy, tipy, users, config, chat_data = load_all_data()
-    ws_zapasy, ws_tipy, ws_users, ws_nastaveni, ws_chat = get_worksheets_resources()
+
+    # Jeden aktuální čas pro celé překreslení (zamčení zápasů, nejbližší zápas, trendy)
+    now_prague = datetime.now(TIMEZONE)
+    locked_matches = zapasy.locked(now_prague)
     
     # --- AKTUALIZACE OFICIÁLNÍCH VÝSLEDKŮ Z DATABÁZE ---
     # Přepíšeme prázdný import z config.py reálnými daty z listu Nastavení
@@ -97,20 +114,15 @@ def render_main_application():
     
     # --- PŘÍPRAVA STATISTIK ZÁPASŮ (CACHE) ---
     match_stats_cache = {}
-    tips_by_match_id = {}
-    for t in tipy:
-        zid = t['Zapas_ID']
-        tips_by_match_id.setdefault(zid, []).append(t)
+    crowd_d, crowd_h, crowd_total = tipy.match_crowd()
     
     for z in zapasy:
         zid = z['ID']
-        mts = tips_by_match_id.get(zid, [])
-        valid_tips = [x for x in mts if not (int(x['Tip_Domaci']) == 0 and int(x['Tip_Hoste']) == 0)]
-        total = len(valid_tips)
+        code = tipy.match_index.get(zid)
+        total = int(crowd_total[code]) if code is not None else 0
         
         if total > 0:
-            d = sum(1 for x in valid_tips if int(x['Tip_Domaci']) > int(x['Tip_Hoste']))
-            h = sum(1 for x in valid_tips if int(x['Tip_Hoste']) > int(x['Tip_Domaci']))
+            d = int(crowd_d[code])
             perc_d = int(d / total * 100)
             perc_h = 100 - perc_d
             match_stats_cache[zid] = (perc_d, perc_h, total)
@@ -146,25 +158,15 @@ def render_main_application():
     # 3. DASHBOARD (VÝSLEDKY | NEJBLIŽŠÍ ZÁPAS | CHAT)
     # ==========================================
     
-    # A) Příprava dat pro NEJBLIŽŠÍ ZÁPAS
-    prague_tz = pytz.timezone('Europe/Prague')
-    now_prague = datetime.now(prague_tz)
+    # A) Příprava dat pro NEJBLIŽŠÍ ZÁPAS (bisect v rozpisu zápasů, viz MatchTable.upcoming)
     upcoming_match = None
-    
-    # Najdeme nejbližší budoucí zápas
-    sorted_matches = sorted([z for z in zapasy if str(z['Skore_Domaci']) == ""], key=lambda x: x.get('Datum_Obj') or datetime.max)
-    
-    for z in sorted_matches:
-        match_dt = z.get('Datum_Obj')
-        if match_dt:
-            if match_dt.tzinfo is None: match_dt = prague_tz.localize(match_dt)
-            if match_dt > now_prague:
-                upcoming_match = z
-                match_dt_aware = match_dt
-                break
+    upcoming_pos = zapasy.upcoming(now_prague)
+    if upcoming_pos is not None:
+        upcoming_match = zapasy[upcoming_pos]
+        match_dt_aware = zapasy.kickoff[upcoming_pos]
     
     # B) Příprava dat pro VÝSLEDKY a CHAT
-    finished_matches = [z for z in zapasy if str(z['Skore_Domaci']) != ""]
+    finished_matches = [z for z in zapasy if z['is_finished']]
     
     # C) VYKRESLENÍ TŘÍ SLOUPCŮ
     # Poměr [1, 1.2, 1] dá prostřednímu bloku trochu víc místa, aby karta dýchala
@@ -244,176 +246,25 @@ def render_main_application():
     if not has_medals and not is_past_deadline(DEADLINE):
         st.warning("⚠️ **POZOR:** Nemáš natipované medaile a vítěze! Jdi do záložky **Medaile**.")
 
-    # Tady kód pokračuje VÝPOČTY BODŮ...
-    # VÝPOČTY BODŮ
-    match_points = {}; exact_matches = {}; matches_scored = {}; stats_basic = {}; stats_playoff = {}
-    # Nové bonusové kontejnery
-    bonus_odvaha = {str(u['Email']): 0 for u in users}
-    bonus_tiper_dne = {str(u['Email']): 0 for u in users}
-
-    zapas_map = {z['ID']: z for z in zapasy}
-    finished_matches = [z for z in zapasy if str(z['Skore_Domaci']) != ""]
-    is_tournament_over = (len(finished_matches) == len(zapasy) and len(zapasy) > 0)
-
-    for u in users: 
-        email = str(u['Email'])
-        match_points[email] = 0; exact_matches[email] = 0; matches_scored[email] = 0; stats_basic[email] = 0; stats_playoff[email] = 0
-
-    tips_map = {}
-    tips_by_match = {} # Pro výpočet procent (Odvaha)
-
-    for t in tipy:
-        tips_map[(str(t['Email']), t['Zapas_ID'])] = t
-        tips_by_match.setdefault(t['Zapas_ID'], []).append(t)
-
-    # 1. ZÁKLADNÍ PRŮCHOD (Body za zápasy + Prodloužení)
-    unique_tips_map = {}
-    for t in tipy:
-        # Tímto se přepíší starší/duplicitní záznamy, zůstane jen jeden unikátní pro User+Zápas
-        unique_tips_map[(str(t['Email']), t['Zapas_ID'])] = t
-
-    # Nyní iterujeme jen přes unikátní tipy
-    for (email, zid), t in unique_tips_map.items():
-        if zid in zapas_map and str(zapas_map[zid]['Skore_Domaci']) != "":
-            z = zapas_map[zid]
-            faze = str(z.get('Faze', '')).lower()
-            # Voláme novou verzi funkce s prodloužením
-            p, ie, sa, _ = spocitej_body_zapas(
-                t['Tip_Domaci'], t['Tip_Hoste'], z['Skore_Domaci'], z['Skore_Hoste'], 
-                z['Domaci'], z['Hoste'], faze,
-                t.get('Tip_Prodlouzeni', ''), z.get('Prodlouzeni', '')
-            )
-            match_points[email] += p
-            if ie: exact_matches[email] += 1
-            if sa: matches_scored[email] += 1
-            if "playoff" in faze or "finále" in faze or "o 3. místo" in faze: stats_playoff[email] += p
-            else: stats_basic[email] += p
-
-    # 2. VÝPOČET: BONUS ZA ODVAHU (Underdog)
-    for z in finished_matches:
-        zid = z['ID']
-        match_tips = tips_by_match.get(zid, [])
-        if not match_tips: continue
-
-        # Kolik % věří komu
-        cnt_d = sum(1 for mt in match_tips if mt['Tip_Domaci'] > mt['Tip_Hoste'])
-        cnt_h = sum(1 for mt in match_tips if mt['Tip_Hoste'] > mt['Tip_Domaci'])
-        total = len(match_tips)
-        if total == 0: continue
-
-        perc_d = cnt_d / total; perc_h = cnt_h / total
-
-        # Kdo vyhrál?
-        rd, rh = int(z['Skore_Domaci']), int(z['Skore_Hoste'])
-        winner = 'd' if rd > rh else ('h' if rh > rd else 'draw')
-
-        # Podmínka < 20%
-        is_underdog_win = (winner == 'd' and perc_d < 0.20) or (winner == 'h' and perc_h < 0.20)
-
-        if is_underdog_win:
-            for mt in match_tips:
-                u_win = 'd' if mt['Tip_Domaci'] > mt['Tip_Hoste'] else ('h' if mt['Tip_Hoste'] > mt['Tip_Domaci'] else 'draw')
-                if u_win == winner:
-                    bonus_odvaha[str(mt['Email'])] += 1
-
-    # 3. VÝPOČET: TIPER DNE (Zpětně podle dnů, ale jen když je den KOMPLETNÍ)
-    tiper_dne_log = [] 
-    # Unikátní dny ze všech zápasů (i neodehraných, abychom věděli, co patří k jakému dni)
-    all_dates = sorted(list(set([z['Datum_Obj'].date() for z in zapasy if z.get('Datum_Obj')])))
-
-    last_finished_day_stats = None # Pro info box (včerejší vítěz)
-
-    for d_date in all_dates:
-        # Všechny zápasy toho dne
-        matches_that_day = [z for z in zapasy if z.get('Datum_Obj') and z['Datum_Obj'].date() == d_date]
-        if not matches_that_day: continue
-
-        # Podmínka: Všechny zápasy toho dne musí mít výsledek
-        day_finished = all(str(z['Skore_Domaci']) != "" for z in matches_that_day)
-
-        if day_finished:
-            daily_pts = {str(u['Email']): 0 for u in users}
-            for z in matches_that_day:
-                # Použijeme unikátní mapu tipů z předchozího kroku (nutno mít aplikovaný fix z minula!)
-                # Pokud fix nemáš, použij: t = next((x for x in tipy if x['Zapas_ID'] == z['ID'] and str(x['Email']) == email), None)
-                for u in users:
-                    email = str(u['Email'])
-                    t = tips_map.get((email, z['ID']))
-                    if t:
-                        p, _, _, _ = spocitej_body_zapas(
-                            t['Tip_Domaci'], t['Tip_Hoste'], z['Skore_Domaci'], z['Skore_Hoste'], 
-                            z['Domaci'], z['Hoste'], z.get('Faze',''),
-                            t.get('Tip_Prodlouzeni', ''), z.get('Prodlouzeni', '')
-                        )
-                        daily_pts[email] += p
-            
-            # Kdo vyhrál den?
-            if daily_pts:
-                max_val = max(daily_pts.values())
-                if max_val > 0:
-                    winners = [e for e, s in daily_pts.items() if s == max_val]
-                    bonus_val = 0.5 * len(matches_that_day) # 0.5 bodu za zápas
-                    
-                    winner_names = []
-                    for w in winners:
-                        bonus_tiper_dne[w] += bonus_val
-                        w_name = next((u['Jmeno'] for u in users if str(u['Email']) == w), w)
-                        winner_names.append(w_name)
-                    
-                    # Log pro statistiky
-                    tiper_dne_log.append({
-                        "Datum": d_date, 
-                        "Jméno": ", ".join(winner_names), 
-                        "Body ten den": max_val, 
-                        "Bonus": bonus_val
-                    })
-                    
-                    # Uložíme si poslední vyhodnocený den pro Info Box
-                    last_finished_day_stats = tiper_dne_log[-1]
-
-    # Kompletace celkových bodů a rozdělení bonusů pro tabulku
-    # Bonus ostrostřelci (Původní logika)
-    max_exact = 0; bonus_ostrostrelci = {}
-    if exact_matches: max_exact = max(exact_matches.values())
-    for email, count in exact_matches.items():
-        bonus_ostrostrelci[email] = 6 if (is_tournament_over and count == max_exact and max_exact > 0) else 0
-
-    long_term_points = {}     # Pouze body za medaile/vítěze
-    
-    for u in users:
-        email = str(u['Email'])
-        lt_pts = spocitej_dlouhodobe_body(u, OFFICIAL_RESULTS)
-        long_term_points[email] = lt_pts
-        
-    # Celkový součet pro řazení
-    total_points = {}
-    for u in users:
-        e = str(u['Email'])
-        total_bonus = (
-            long_term_points.get(e, 0) + 
-            bonus_ostrostrelci.get(e, 0) + 
-            bonus_odvaha.get(e, 0) + 
-            bonus_tiper_dne.get(e, 0)
-        )
-        total_points[e] = match_points.get(e, 0) + total_bonus
-
-    # PŘÍPRAVA DAT PRO ŽEBŘÍČEK - S novými sloupci
-    rd = []
-    for u in users:
-        e = str(u['Email'])
-        rd.append({
-            "Email": e, 
-            "Hráč": u['Jmeno'], 
-            "Tým": u.get('Tym', '-'), 
-            "Zaplaceno": str(u.get('Zaplaceno', 'NE')).upper(), 
-            "Body Zápasy": match_points.get(e,0), 
-            "Tiper Dne": bonus_tiper_dne.get(e, 0),    # Nový sloupec
-            "Odvaha": bonus_odvaha.get(e, 0),          # Nový sloupec
-            "Medaile/Vítěz": long_term_points.get(e, 0) + bonus_ostrostrelci.get(e, 0), # Sloučené dlouhodobé
-            "Celkem": total_points.get(e,0)
-        })
-    df_rank = pd.DataFrame(rd).sort_values("Celkem", ascending=False).reset_index(drop=True)
-    df_rank['Pořadí'] = df_rank['Celkem'].rank(method='min', ascending=False).astype(int)
+    # VÝPOČTY BODŮ - celý žebříček počítá business/standings.py (compute_standings)
+    # jednou na verzi dat pro všechny sessions; překreslení stránky jen vykresluje.
+    standings = get_standings_cache().get(zapasy, tipy, users, OFFICIAL_RESULTS, now_prague)
+    scores = standings.scores
+    exact_matches = standings.exact_matches
+    matches_scored = standings.matches_scored
+    stats_basic = standings.stats_basic; stats_playoff = standings.stats_playoff
+    bonus_odvaha = standings.bonus_odvaha; bonus_tiper_dne = standings.bonus_tiper_dne
+    total_points = standings.total_points
+    finished_matches = standings.finished_matches
+    tips_by_match = standings.tips_by_match
+    tiper_dne_log = standings.tiper_dne_log
+    timeline = standings.timeline
+
+    # Poslední vyhodnocený den pro Info Box (včerejší vítěz)
+    last_finished_day_stats = tiper_dne_log[-1] if tiper_dne_log else None
+
+    # Tabulka žebříčku (vlastní kopie - přidávají se do ní sloupce pro zobrazení)
+    df_rank = standings.rank_table()
 
     # --- NAPLNĚNÍ INFO BOXU (Placeholder nahoře) ---
     with info_box_placeholder:
@@ -443,6 +294,13 @@ def render_main_application():
             # HTML string bez odsazení
             breakdown_html = f"""<div style="font-size: 0.85em; color: #475569; margin-top: 4px; margin-bottom: 8px;">Zápasy: <b>{p_match:.1f}</b> | Tiper dne: <b>{p_tiper:.1f}</b> | Odvaha: <b>{p_odvaha:.1f}</b> | Koncový bonus: <b>{p_end:.1f}</b></div>"""
 
+            # Kolik ještě jde získat (horní odhad z business/standings.py: max_achievable)
+            my_email = st.session_state['user_email']
+            my_max = float(standings.max_points.get(my_email, my_points))
+            if my_max > my_points:
+                max_note = " Na bednu už to matematicky nejde." if standings.best_rank.get(my_email, 1) > 3 else ""
+                breakdown_html += f"""<div style="font-size: 0.8em; color: #64748b; margin-bottom: 8px;">Ještě můžeš získat až <b>{my_max - my_points:.1f} b.</b> (maximum {my_max:.1f} b.).{max_note}</div>"""
+
             # Sousedé v žebříčku
             ahead_txt = ""
             behind_txt = ""
@@ -493,18 +351,9 @@ def render_main_application():
             st.warning("Zatím nejsi v žebříčku.")
 
     # Trendy
-    prague_tz = pytz.timezone('Europe/Prague')  # 1. Musíme znát zónu
-    yesterday_limit = datetime.now(prague_tz) - timedelta(days=1) # 2. Teď je 'yesterday_limit' aware (má zónu)
-    pts_yesterday = get_user_points_at_date(users, tipy, zapasy, date_limit=yesterday_limit)
-    rd_prev = []
-    for u in users:
-        e = str(u['Email'])
-        b_prev = pts_yesterday.get(e, 0)
-        rd_prev.append({"Email": e, "Total": b_prev})
-    df_prev = pd.DataFrame(rd_prev).sort_values("Total", ascending=False).reset_index(drop=True)
-    df_prev.index += 1
-    df_prev['Pořadí'] = df_prev.index
-    prev_ranks = df_prev.set_index('Email')['Pořadí'].to_dict()
+    yesterday_limit = now_prague - timedelta(days=1)
+    # Pořadí před 24 h z vývoje žebříčku (body včetně odvahy a tipera dne, stejně jako Celkem)
+    prev_ranks = standings.rank_trends(yesterday_limit)
 
     df_rank['Vývoj pořadí'] = ""
     leader_score = df_rank.iloc[0]['Celkem'] if not df_rank.empty else 0
@@ -523,7 +372,7 @@ def render_main_application():
                 df_rank.at[idx, 'Vývoj pořadí'] = "🆕"
 
     # --- POČÍTADLO ZPRÁV (CELKOVÉ) ---
-    count_msg = len(chat_data)
+    count_msg = chat_data.total
     label_chat = f"🗣️ Diskuze ({count_msg})"
 
     # ZÁLOŽKY
@@ -566,32 +415,31 @@ def render_main_application():
             * Stav **0:0** se ignoruje (bere se jako nenatipováno).
             """)
 
-        moje_tipy_dict = {str(t['Zapas_ID']): t for t in tipy if str(t['Email']) == st.session_state['user_email']}
+        moje_tipy_dict = {t['Zapas_ID']: t for t in tipy if t['Email'] == st.session_state['user_email']}
         
         # --- NOVÝ PŘEPÍNAČ NAD FORMULÁŘEM ---
         st.write("")
         _, c_archiv, _ = st.columns([1, 1.5, 1])
         with c_archiv:
             zobrazit_archiv = st.checkbox("Zobrazit již odehrané a probíhající zápasy (dole na stránce)", value=False)
+
+        # Tipy, které se po odeslání opakovaně nenašly v úložišti (zůstávají ve frontě a zkouší se dál)
+        nepotvrzene = unconfirmed_tips(st.session_state['user_email'])
+        if nepotvrzene:
+            nazvy = [f"{z['Domaci']} vs {z['Hoste']}" for z in (zapasy.by_id(zid) for zid in nepotvrzene) if z]
+            st.warning("⚠️ Některé tipy se zatím nepodařilo zapsat do tabulky, ukládání se opakuje: " + ", ".join(nazvy or nepotvrzene))
         
         with st.form("tips_form"):
             tips_to_save = {} 
             match_names_map = {}
 
             # --- 1. ROZTŘÍDĚNÍ ZÁPASŮ ---
-            prague_tz = pytz.timezone('Europe/Prague')
-            now_prague = datetime.now(prague_tz)
-            
             aktivni_zapasy = []
             odehrane_zapasy = []
 
-            for z in zapasy:
-                match_dt = z.get('Datum_Obj')
-                if match_dt and match_dt.tzinfo is None:
-                    match_dt = prague_tz.localize(match_dt)
-
-                is_locked = (match_dt and now_prague > match_dt)
-                is_played = (str(z['Skore_Domaci']) != "")
+            for pos, z in enumerate(zapasy):
+                is_locked = bool(locked_matches[pos])
+                is_played = z['is_finished']
                 
                 if is_locked or is_played:
                     odehrane_zapasy.append((z, is_locked, is_played))
@@ -711,7 +559,7 @@ def render_main_application():
                     zpravy_placeholder.error(msg)
                 else:
                     with st.spinner("Ukládám tipy..."): 
-                        save_tips_batch(ws_tipy, st.session_state['user_email'], tips_to_save, tipy)
+                        save_tips_batch(st.session_state['user_email'], tips_to_save, tipy)
                         zpravy_placeholder.success("✅ Tipy úspěšně uloženy!")
                         time.sleep(1)
                         st.rerun()
@@ -733,23 +581,21 @@ def render_main_application():
         all_matches_sorted = sorted(zapasy, key=lambda x: int(x['ID']))
         
         data = []
-        tips_map = {(str(t['Email']), t['Zapas_ID']): t for t in tipy}
+        tips_map = {(t['Email'], t['Zapas_ID']): t for t in tipy}
 
         # Počítadlo řádků pro sloupec "#"
         row_idx = 1
 
         for z in all_matches_sorted:
             # Zjištění stavu zápasu
-            is_finished = (str(z['Skore_Domaci']) != "")
+            is_finished = z['is_finished']
             
-            # Kontrola času (LOCK)
-            prague_tz = pytz.timezone('Europe/Prague')
-            now_prague = datetime.now(prague_tz)
-            match_dt = z.get('Datum_Obj')
-            if match_dt and match_dt.tzinfo is None: match_dt = prague_tz.localize(match_dt)
+            # Kontrola času (LOCK) - předpočítané zamčení pro tento běh stránky
+            pos = zapasy.position[z['ID']]
+            match_dt = zapasy.kickoff[pos]
             
             # Zápas je "viditelný" (revealed), pokud je odehrán NEBO už uplynul čas začátku (zamčeno)
-            is_revealed = is_finished or (match_dt and now_prague > match_dt)
+            is_revealed = is_finished or bool(locked_matches[pos])
 
             faze = z.get('Faze', '')
             vis_result = f"{z['Skore_Domaci']}:{z['Skore_Hoste']}" if is_finished else (f"{z['Datum_Obj'].strftime('%d.%m. %H:%M')}" if match_dt else "-")
@@ -784,12 +630,7 @@ def render_main_application():
                             
                             # Body počítáme a zobrazujeme JEN pokud je zápas dohrán (is_finished)
                             if is_finished:
-                                p, ie, _, _ = spocitej_body_zapas(
-                                    t['Tip_Domaci'], t['Tip_Hoste'], 
-                                    z['Skore_Domaci'], z['Skore_Hoste'], 
-                                    z['Domaci'], z['Hoste'], z.get('Faze',''),
-                                    t.get('Tip_Prodlouzeni', ''), z.get('Prodlouzeni', '')
-                                )
+                                p, ie, _, _ = scores.get(email, z['ID'])
                                 txt += f" ({p} b.)"
                                 if ie: txt = f"⭐ {txt}"
                     else:
@@ -929,16 +770,9 @@ def render_main_application():
             # Ukládáme jen když se klikne A NENÍ zamčeno (pojistka)
             if submit_medals and not lck:
                 with st.spinner("Ukládám medaile..."):
-                    row_idx = me_idx + 2
-                    updates = [
-                        gspread.Cell(row_idx, 7, sw),
-                        gspread.Cell(row_idx, 8, m1),
-                        gspread.Cell(row_idx, 9, m2),
-                        gspread.Cell(row_idx, 10, m3)
-                    ]
+                    updates = {'Tip_Vitez': sw, 'Tip_Med1': m1, 'Tip_Med2': m2, 'Tip_Med3': m3}
                     try:
-                        ws_users.update_cells(updates)
-                        st.cache_data.clear()
+                        update_user_fields(me_idx, updates)
                         st.success("✅ Tipy na medaile byly úspěšně uloženy!")
                         time.sleep(1) 
                         st.rerun()
@@ -1016,10 +850,16 @@ def render_main_application():
         ]
         
         # 5. Vytvoření display dataframe
+        # Maximum bodů a o která místa ještě hraje (❌ = na bednu už matematicky nedosáhne)
+        df_show['Max. možné'] = df_show['Email'].map(standings.max_points)
+        df_show['Ve hře o'] = df_show['Email'].map(lambda e: {1: "🥇🥈🥉", 2: "🥈🥉", 3: "🥉"}.get(standings.best_rank.get(e), "❌"))
+        cols_map.update({'Max. možné': 'Max.\nmožné', 'Ve hře o': 'Ve hře\no'})
+        source_cols += ['Max. možné', 'Ve hře o']
+
         df_display = df_show[source_cols].copy().rename(columns=cols_map)
         
         # 6. Formátování BODOVÝCH sloupců (na 1 desetinné místo + " b.")
-        format_cols_points = ['CELKEM', 'Zápasy', 'Tiper\nDne', 'Bonus\nOdvaha', 'Koncový\nbonus']
+        format_cols_points = ['CELKEM', 'Zápasy', 'Tiper\nDne', 'Bonus\nOdvaha', 'Koncový\nbonus', 'Max.\nmožné']
         for col in format_cols_points:
             if col in df_display.columns:
                 # x může být float nebo int. F-string :.1f zvládne obojí.
@@ -1075,6 +915,57 @@ def render_main_application():
             hide_index=True,
             height=600
         )
+
+        with st.expander("📈 Vývoj pořadí"):
+            if timeline.match_ids:
+                names_by_email = {str(u['Email']): u['Jmeno'] for u in users}
+                default_players = [st.session_state['user_name']] + df_rank['Hráč'].head(3).tolist()
+                sel_players = st.multiselect(
+                    "Hráči", df_rank['Hráč'].tolist(),
+                    default=[p for p in dict.fromkeys(default_players) if p in df_rank['Hráč'].tolist()],
+                    key="rank_history_players"
+                )
+                # Pořadí po každém odehraném zápasu (řádek 0 = před turnajem se nezobrazuje)
+                df_hist = pd.DataFrame(timeline.ranks[1:], columns=[names_by_email[e] for e in timeline.emails])
+                df_hist.index = range(1, len(df_hist) + 1)
+                df_hist = df_hist.loc[:, ~df_hist.columns.duplicated()][[p for p in sel_players if p in df_hist.columns]]
+                if not df_hist.empty:
+                    df_long = df_hist.rename_axis("Zápas").reset_index().melt("Zápas", var_name="Hráč", value_name="Pořadí")
+                    chart = alt.Chart(df_long).mark_line(point=True).encode(
+                        x=alt.X("Zápas:Q", title="Po zápase"),
+                        y=alt.Y("Pořadí:Q", scale=alt.Scale(reverse=True, domainMin=1)),
+                        color="Hráč:N",
+                        tooltip=["Hráč", "Zápas", "Pořadí"]
+                    )
+                    st.altair_chart(chart, use_container_width=True)
+            else:
+                st.write("Zatím se nehrálo.")
+
+        with st.expander("🔮 Šance na bednu"):
+            if len(finished_matches) == len(zapasy) and OFFICIAL_RESULTS.get('winner'):
+                st.write("Turnaj skončil, pořadí je konečné.")
+            else:
+                st.caption(f"Odhad z {PROJECTION_SIMULATIONS} simulací zbytku turnaje. Výsledky zápasů se losují z vašich tipů, medaile podle tipů na medaile.")
+                try:
+                    df_proj = get_projection_runner().get(
+                        results_key(zapasy, OFFICIAL_RESULTS),
+                        lambda: build_projection(zapasy, tipy, users, standings, OFFICIAL_RESULTS),
+                        PROJECTION_SIMULATIONS, PROJECTION_CHUNK
+                    )
+                except Exception as e:
+                    df_proj = None
+                    st.warning(f"Projekci se nepodařilo spočítat: {e}")
+                else:
+                    if df_proj is None:
+                        st.info("⏳ Simulace běží na pozadí, výsledek se ukáže po obnovení stránky.")
+                    else:
+                        st.dataframe(
+                            df_proj.drop(columns=["Email"]), use_container_width=True, hide_index=True,
+                            column_config={
+                                c: st.column_config.ProgressColumn(c, format="percent", min_value=0, max_value=1)
+                                for c in ["1. místo", "2. místo", "3. místo", "Na bedně"]
+                            }
+                        )
     # 5. STATISTIKY
     with t_stats:
         st.header("Statistika nuda je, má však cenné údaje")
@@ -1087,7 +978,7 @@ def render_main_application():
             st.caption("Kdo získal bonus za **včerejší** den? (Nejvíce bodů za den)")
 
             # Zjištění včerejška pro zobrazení "aktuálního" vítěze
-            yesterday = datetime.now().date() - timedelta(days=1)
+            yesterday = now_prague.date() - timedelta(days=1)
             yesterday_winners = [x for x in tiper_dne_log if x['Datum'] == yesterday]
 
             if yesterday_winners:
@@ -1103,6 +994,17 @@ def render_main_application():
                 else:
                     st.write("Zatím nikdo.")
 
+            with st.expander("📆 Denní žebříček"):
+                # Dny s aspoň jedním odehraným zápasem (body po dnech jsou spočítané v hlavním průchodu)
+                played_days = [d for i, d in enumerate(scores.days) if zapasy.is_finished[scores.day_matches[i]].any()]
+                if played_days:
+                    sel_day = st.selectbox("Den", played_days[::-1], format_func=lambda d: d.strftime('%d.%m.'), key="daily_board_day")
+                    day_pts = scores.day_points(sel_day)
+                    day_data = [{"Jméno": u['Jmeno'], "Body": day_pts.get(str(u['Email']), 0)} for u in users]
+                    st.dataframe(pd.DataFrame(day_data).sort_values("Body", ascending=False), use_container_width=True, hide_index=True)
+                else:
+                    st.write("Zatím se nehrálo.")
+
         with col_spec2:
             st.markdown("#### 🦁 Bonus za Odvahu")
             st.caption("Hráči, kteří trefili vítěze, na kterého sázelo **méně než 20 %** lidí (+1 bod).")
@@ -1130,18 +1032,18 @@ def render_main_application():
 
                 # --- 1. PŘÍPRAVA PRO BONUS ZA ODVAHU ---
                 # Musíme filtrovat tipy i pro výpočet procent, aby 0:0 nezkreslovalo "dav"
-                valid_tips_for_perc = [t for t in match_tips if not (int(t['Tip_Domaci']) == 0 and int(t['Tip_Hoste']) == 0)]
+                valid_tips_for_perc = [t for t in match_tips if not (t['Tip_Domaci'] == 0 and t['Tip_Hoste'] == 0)]
                 
                 if not valid_tips_for_perc: continue # Pokud nikdo nenatipoval, jdeme dál
 
-                cnt_d = sum(1 for mt in valid_tips_for_perc if int(mt['Tip_Domaci']) > int(mt['Tip_Hoste']))
-                cnt_h = sum(1 for mt in valid_tips_for_perc if int(mt['Tip_Hoste']) > int(mt['Tip_Domaci']))
+                cnt_d = sum(1 for mt in valid_tips_for_perc if mt['Tip_Domaci'] > mt['Tip_Hoste'])
+                cnt_h = sum(1 for mt in valid_tips_for_perc if mt['Tip_Hoste'] > mt['Tip_Domaci'])
                 total_tips = len(valid_tips_for_perc)
                 
                 perc_d = cnt_d / total_tips
                 perc_h = cnt_h / total_tips
                 
-                rd, rh = int(z['Skore_Domaci']), int(z['Skore_Hoste'])
+                rd, rh = z['Skore_Domaci'], z['Skore_Hoste']
                 real_winner = 'd' if rd > rh else ('h' if rh > rd else 'draw')
                 
                 # Byl vítěz outsider? (< 20%)
@@ -1154,7 +1056,7 @@ def render_main_application():
                 valid_tips_count = 0
 
                 for t in match_tips:
-                    td, th = int(t['Tip_Domaci']), int(t['Tip_Hoste'])
+                    td, th = t['Tip_Domaci'], t['Tip_Hoste']
                     
                     # === FILTR: IGNOROVAT 0:0 (NENATIPOVÁNO) ===
                     if td == 0 and th == 0:
@@ -1233,24 +1135,14 @@ def render_main_application():
         st.caption("Zápasy s nejvyšším a nejnižším průměrem bodů na hráče.")
 
         if finished_matches:
-            # Přepočet statistik pro zápasy
+            # Součty bodů a počty tipů po zápasech (z hlavního průchodu, včetně OT)
             match_stats = []
+            pts_by_match, tips_count = scores.per_match(scores.points)
             for z in finished_matches:
-                tips_for_z = tips_by_match.get(z['ID'], [])
-                if not tips_for_z: continue
-
-                total_pts = 0; count = 0
-                faze_lower = str(z.get('Faze', '')).lower()
-                is_playoff = any(x in faze_lower for x in ["playoff", "finále", "o 3. místo", "čtvrtfinále", "semifinále"])
-
-                for t in tips_for_z:
-                    # Zde musíme použít správnou funkci pro výpočet bodů, kterou jsme definovali dříve (včetně OT)
-                    p, _, _, _ = spocitej_body_zapas(
-                        t['Tip_Domaci'], t['Tip_Hoste'], z['Skore_Domaci'], z['Skore_Hoste'], 
-                        z['Domaci'], z['Hoste'], z.get('Faze',''),
-                        t.get('Tip_Prodlouzeni', ''), z.get('Prodlouzeni', '')
-                    )
-                    total_pts += p; count += 1
+                pos = zapasy.position[z['ID']]
+                total_pts, count = pts_by_match[pos], tips_count[pos]
+
+                is_playoff = zapasy.is_stats_playoff[pos]
 
                 if count > 0:
                     match_stats.append({
@@ -1359,14 +1251,11 @@ def render_main_application():
                     if new_t: final_team = new_t
 
                 if st.form_submit_button("💾 Uložit změnu týmu"):
-                    row_idx = current_u_idx + 2
-                    # Aktualizujeme POUZE sloupec 6 (Tým), sloupec 2 (Jméno) necháváme být
-                    updates = [gspread.Cell(row_idx, 6, final_team)]
+                    # Aktualizujeme POUZE Tým, Jméno necháváme být
                     try:
-                        ws_users.update_cells(updates)
+                        update_user_fields(current_u_idx, {'Tym': final_team})
                         # st.session_state['user_name'] už neměníme
                         st.session_state['user_team'] = final_team
-                        st.cache_data.clear()
                         st.success("✅ Tým byl úspěšně aktualizován!")
                         time.sleep(1)
                         st.rerun()
@@ -1387,8 +1276,7 @@ def render_main_application():
                         if p_new == p_new2:
                             if len(p_new) > 0:
                                 new_hash = make_hash(p_new)
-                                ws_users.update_cell(current_u_idx + 2, 3, new_hash) # Sloupec 3 je Heslo
-                                st.cache_data.clear()
+                                update_user_password(current_u_idx, new_hash)
                                 st.success("Heslo úspěšně změněno!")
                             else:
                                 st.error("Heslo nesmí být prázdné.")
@@ -1505,7 +1393,7 @@ def render_main_application():
     # 10. DISKUZE
     with t_chat:
         # Jakmile uživatel otevře tuto záložku, uložíme si, že viděl všechny aktuální zprávy
-        st.session_state['chat_seen_count'] = len(chat_data)
+        st.session_state['chat_seen_count'] = chat_data.total
 
         st.header("🗣️ Diskuze")
 
@@ -1514,8 +1402,8 @@ def render_main_application():
         if 'chat_limit' not in st.session_state:
             st.session_state['chat_limit'] = 30
 
-        # Kolik zpráv máme celkem v DB?
-        total_msgs = len(chat_data)
+        # Kolik zpráv máme celkem v DB? (načtená je jen poslední stránka)
+        total_msgs = chat_data.total
         # Kolik jich teď chceme zobrazit?
         current_limit = st.session_state['chat_limit']
 
@@ -1532,8 +1420,7 @@ def render_main_application():
                 now_str = datetime.now(prague_tz).strftime("%d.%m. %H:%M")
                 user_nm = st.session_state['user_name']
                 try:
-                    ws_chat.append_row([now_str, user_nm, new_msg])
-                    st.cache_data.clear()
+                    post_chat_message(now_str, user_nm, new_msg)
                     st.rerun()
                 except Exception as e: st.error(f"Chyba: {e}")
 
@@ -1546,7 +1433,8 @@ def render_main_application():
                 st.info("Zatím tu je ticho... Buď první!")
             else:
                 # Vezmeme posledních X zpráv podle limitu (např. posledních 30, 60...)
-                msgs_to_show = chat_data[-current_limit:]
+                # Starší stránky se stáhnou až teď, po kliknutí na "Načíst další"
+                msgs_to_show = load_chat_messages(current_limit)
 
                 # Otočíme je, aby nejnovější byly nahoře
                 for msg in reversed(msgs_to_show): 
@@ -1656,35 +1544,55 @@ def render_main_application():
         with t_admin:
             st.header(f"Panel: {user_role.capitalize()}")
 
-            # 1. ZADÁVÁNÍ VÝSLEDKŮ
+            # 1. ZADÁVÁNÍ VÝSLEDKŮ (hromadně - všechny změny jedním zápisem)
             with st.expander("Výsledky zápasů", expanded=True):
-                z_names = [f"{z['ID']}: {z['Domaci']} vs {z['Hoste']}" for z in zapasy]
-                sel_z = st.selectbox("Vyber zápas", z_names)
-                sid = int(sel_z.split(":")[0])
-                with st.form("admin_score"):
-                    curr_z = next((x for x in zapasy if x['ID'] == sid), {})
-
-                    # Tady máme plnou šířku, takže 3 sloupce budou vypadat skvěle
-                    c1, c2, c3 = st.columns(3)
-                    d = c1.text_input("Góly Domácí", value=curr_z.get('Skore_Domaci', ''))
-                    h = c2.text_input("Góly Hosté", value=curr_z.get('Skore_Hoste', ''))
-
-                    curr_ot = str(curr_z.get('Prodlouzeni', 'NE')).upper()
-                    ot_val = c3.selectbox("Prodloužení?", ["NE", "ANO"], index=1 if curr_ot == "ANO" else 0, key=f"admin_ot_{sid}")
+                only_open = st.checkbox("Jen zápasy bez výsledku", value=True)
+                res_rows = [{
+                    "ID": z['ID'],
+                    "Datum": z['Datum_Obj'].strftime('%d.%m. %H:%M') if z.get('Datum_Obj') else str(z.get('Datum', '')),
+                    "Zápas": f"{z['Domaci']} vs {z['Hoste']}",
+                    "Skore_Domaci": str(z['Skore_Domaci']),
+                    "Skore_Hoste": str(z['Skore_Hoste']),
+                    "Prodlouzeni": "ANO" if str(z.get('Prodlouzeni', '')).upper() == "ANO" else "NE",
+                } for z in zapasy if not (only_open and z['is_finished'])]
+
+                if not res_rows:
+                    st.info("Všechny zápasy mají výsledek.")
+                else:
+                    df_res = pd.DataFrame(res_rows)
+                    with st.form("admin_scores"):
+                        edited = st.data_editor(
+                            df_res, hide_index=True, use_container_width=True,
+                            disabled=["ID", "Datum", "Zápas"],
+                            column_config={
+                                "Skore_Domaci": st.column_config.TextColumn("Góly Domácí"),
+                                "Skore_Hoste": st.column_config.TextColumn("Góly Hosté"),
+                                "Prodlouzeni": st.column_config.SelectboxColumn("Prodloužení?", options=["NE", "ANO"]),
+                            },
+                            key="admin_scores_editor"
+                        )
+                        if st.form_submit_button("💾 Uložit výsledky"):
+                            # Ukládáme jen změněné řádky
+                            changed = [new for new, old in zip(edited.to_dict("records"), res_rows) if new != old]
+                            save_admin_results(changed, zapasy)
+
+            with st.expander("Hromadný import výsledků (CSV / JSON)"):
+                st.caption("Sloupce: **ID, Skore_Domaci, Skore_Hoste, Prodlouzeni** (ANO/NE). JSON = seznam objektů se stejnými klíči.")
+                up_file = st.file_uploader("Soubor s výsledky", type=["csv", "json"], key="admin_results_file")
+                if up_file is not None:
+                    imp_rows = []
+                    try:
+                        if up_file.name.lower().endswith(".json"):
+                            imp_rows = json.load(up_file)
+                            if isinstance(imp_rows, dict): imp_rows = [imp_rows]
+                        else:
+                            imp_rows = pd.read_csv(up_file, dtype=str, keep_default_na=False, sep=None, engine="python").to_dict("records")
+                    except Exception as e: st.error(f"Soubor nejde přečíst: {e}")
 
-                    if st.form_submit_button("💾 Uložit výsledek"):
-                        try:
-                            all_ids = ws_zapasy.col_values(1) 
-                            search_id = str(sid)
-                            if search_id in all_ids:
-                                row_idx = all_ids.index(search_id) + 1
-                                ws_zapasy.update_cell(row_idx, 5, d)
-                                ws_zapasy.update_cell(row_idx, 6, h)
-                                ws_zapasy.update_cell(row_idx, 8, ot_val)
-                                st.cache_data.clear(); st.success(f"✅ Výsledek zápasu {sid} uložen!"); time.sleep(1); st.rerun()
-                            else:
-                                st.error(f"❌ Chyba: ID zápasu '{sid}' nenalezeno.")
-                        except Exception as e: st.error(f"Chyba: {e}")
+                    if imp_rows:
+                        st.dataframe(pd.DataFrame(imp_rows), use_container_width=True, hide_index=True)
+                        if st.button(f"📥 Importovat výsledky ({len(imp_rows)})"):
+                            save_admin_results(imp_rows, zapasy)
 
             # 2. POUZE PRO HLAVNÍHO ADMINA
             if user_role == 'admin':
@@ -1700,12 +1608,9 @@ def render_main_application():
                             m2 = st.selectbox("Medaile 2", ht, index=get_idx(config.get('med_2', '')))
                             m3 = st.selectbox("Medaile 3", ht, index=get_idx(config.get('med_3', '')))
                             if st.form_submit_button("Uzavřít turnaj"):
-                                def upd(k, v):
-                                    c = ws_nastaveni.find(k)
-                                    if c: ws_nastaveni.update_cell(c.row, 2, v)
-                                    else: ws_nastaveni.append_row([k, v])
-                                upd('vitez_turnaje', w); upd('med_1', m1); upd('med_2', m2); upd('med_3', m3)
-                                st.cache_data.clear(); st.success("Turnaj uzavřen!"); st.rerun()
+                                set_config_value('vitez_turnaje', w); set_config_value('med_1', m1)
+                                set_config_value('med_2', m2); set_config_value('med_3', m3)
+                                st.success("Turnaj uzavřen!"); st.rerun()
 
                 with col_ad2:
                     with st.expander("Správa plateb"):
@@ -1717,9 +1622,50 @@ def render_main_application():
                         st.write(f"Stav: **{str(users[u_idx].get('Zaplaceno', 'NE'))}**")
                         c_p1, c_p2 = st.columns(2)
                         if c_p1.button("✅ Zaplaceno"):
-                            ws_users.update_cell(u_idx+2, 11, "ANO"); st.cache_data.clear(); st.success("OK"); time.sleep(0.5); st.rerun()
+                            update_user_fields(u_idx, {'Zaplaceno': "ANO"}); st.success("OK"); time.sleep(0.5); st.rerun()
                         if c_p2.button("❌ Nezaplaceno"):
-                            ws_users.update_cell(u_idx+2, 11, "NE"); st.cache_data.clear(); st.success("OK"); time.sleep(0.5); st.rerun()
+                            update_user_fields(u_idx, {'Zaplaceno': "NE"}); st.success("OK"); time.sleep(0.5); st.rerun()
+
+                with st.expander("Údržba listu Tipy"):
+                    st.write(f"Řádků s tipy: **{len(tipy) + tipy.duplicates}**, z toho duplicitních: **{tipy.duplicates}**")
+                    st.caption("Duplicitní tipy (stejný hráč a zápas) se při načtení slučují - platí poslední řádek. Sloučení je z listu odstraní jedním zápisem.")
+                    if st.button("🧹 Sloučit duplicitní tipy", disabled=tipy.duplicates == 0):
+                        try:
+                            removed = compact_tips()
+                            st.success(f"✅ Odstraněno řádků: {removed}"); time.sleep(1); st.rerun()
+                        except Exception as e: st.error(f"Chyba: {e}")
+
+                with st.expander("🧪 Simulátor pravidel (co kdyby)"):
+                    st.caption("Přepočítá celý turnaj podle jiných pravidel a ukáže žebříčky vedle sebe. Nic se neukládá.")
+                    # Každý řádek = jedna sada pravidel (první řádek je základ pro porovnání i pro sérii)
+                    df_rules = st.data_editor(
+                        pd.DataFrame([dict({"Název": "Aktuální"}, **POINTS_CONFIG)]),
+                        num_rows="dynamic", hide_index=True, use_container_width=True,
+                        key="sim_rules_editor"
+                    )
+                    c_s1, c_s2 = st.columns(2)
+                    sweep_param = c_s1.selectbox("Série pro parametr (volitelné)", ["-"] + list(POINTS_CONFIG), key="sim_sweep_param")
+                    sweep_values = c_s2.text_input("Hodnoty (oddělené čárkou)", placeholder="1, 1.25, 1.5, 2", key="sim_sweep_values")
+
+                    if st.button("▶️ Přepočítat"):
+                        try:
+                            rule_sets = []
+                            for i, row in enumerate(df_rules.to_dict("records")):
+                                name = str(row.pop("Název") or f"Sada {i + 1}")
+                                rule_sets.append((name, {k: rule_value(k, v) for k, v in row.items() if k in POINTS_CONFIG and pd.notnull(v)}))
+                            if sweep_param != "-" and sweep_values.strip() and rule_sets:
+                                values = [rule_value(sweep_param, v) for v in sweep_values.split(",") if v.strip()]
+                                rule_sets += rule_variants(rule_sets[0][1], sweep_param, values)
+                            if rule_sets:
+                                t_start = time.time()
+                                st.session_state['sim_result'] = compare_rules(zapasy, tipy, users, rule_sets, OFFICIAL_RESULTS)
+                                st.session_state['sim_time'] = time.time() - t_start
+                        except ValueError as e:
+                            st.error(f"Neplatná pravidla: {e}")
+
+                    if 'sim_result' in st.session_state:
+                        st.caption(f"Přepočteno za {st.session_state['sim_time']:.2f} s")
+                        st.dataframe(st.session_state['sim_result'], use_container_width=True, hide_index=True)
 
 
 # PATIČKA
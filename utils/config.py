@@ -3,6 +3,7 @@ Konfigurace aplikace
 ZACHOVÁNO: Všechny konstanty z tipovacka_12.py
 """
 
+import os
 import pytz
 
 # --- ZÁKLADNÍ NASTAVENÍ ---
@@ -10,6 +11,60 @@ MAX_PLAYERS = 40
 MAX_SCORE_VALUE = 20
 TIMEZONE = pytz.timezone('Europe/Prague')
 
+# --- ÚLOŽIŠTĚ DAT ---
+# "sheets" = Google Sheets (výchozí), "sqlite" = lokální SQLite databáze
+STORAGE_BACKEND = os.environ.get("TIPOVACKA_STORAGE", "sheets")
+SQLITE_PATH = os.environ.get("TIPOVACKA_SQLITE_PATH", "tipovacka.db")
+SPREADSHEET_NAME = "Tipovacka_Data"
+# Klíč (ID z URL) tabulky - otevření bez hledání podle názvu v Drive (jde zadat i jako secrets spreadsheet_key)
+SPREADSHEET_KEY = os.environ.get("TIPOVACKA_SPREADSHEET_KEY", "")
+
+# Struktura listů (pořadí sloupců odpovídá Google Sheetu)
+SHEET_COLUMNS = {
+    "Zapasy": ["ID", "Datum", "Domaci", "Hoste", "Skore_Domaci", "Skore_Hoste", "Faze", "Prodlouzeni"],
+    "Tipy": ["Email", "Zapas_ID", "Tip_Domaci", "Tip_Hoste", "Tip_Prodlouzeni"],
+    "Uzivatele": [
+        "Email", "Jmeno", "Heslo", "Body", "Role", "Tym",
+        "Tip_Vitez", "Tip_Med1", "Tip_Med2", "Tip_Med3", "Zaplaceno",
+        "Rezerva_1", "Rezerva_2", "Povoleno", "ID"
+    ],
+    "Chat": ["Datum", "Hrac", "Zprava"],
+    "Nastaveni": ["Klic", "Hodnota"],
+    "Reset": ["Email", "Datum", "Status"],
+    # Log změn tipů pro inkrementální synchronizaci (Radek = číslo řádku v listu Tipy)
+    "Tipy_Zmeny": ["Radek", "Email", "Zapas_ID", "Tip_Domaci", "Tip_Hoste", "Tip_Prodlouzeni"],
+}
+
+# Synchronizace tipů: mezi plnými načteními se stahují jen nové a změněné řádky
+TIPS_FULL_RESYNC_SECONDS = 15 * 60
+
+# Chat: načítá se jen konec listu, starší zprávy po stránkách na vyžádání
+CHAT_PAGE_SIZE = 30
+
+# Deník tipů (write-behind): tipy se uloží lokálně a do úložiště je dávkově odešle vlákno na pozadí
+TIP_JOURNAL_PATH = os.environ.get("TIPOVACKA_JOURNAL_PATH", "tip_journal.db")
+TIP_FLUSH_DELAY = 2          # s - okno pro sloučení uložení od více hráčů do jedné dávky
+TIP_FLUSH_MAX_BACKOFF = 120  # s - maximální pauza mezi opakovanými pokusy
+TIP_FLUSH_LEASE = 300        # s - zámek odesílání ve sdíleném deníku (vyprší, když proces spadne)
+
+# Snapshot dat na disku: okamžitý start po restartu a záloha při výpadku úložiště
+SNAPSHOT_DIR = os.environ.get("TIPOVACKA_SNAPSHOT_DIR", "snapshot")
+
+# Sdílená data pro více procesů serveru (repliky): jeden proces stahuje, ostatní čtou z disku.
+# Prázdné = vypnuto (každý proces stahuje sám)
+SHARED_DATA_DIR = os.environ.get("TIPOVACKA_SHARED_DIR", "")
+
+# Kvóta Google Sheets API (limit je 60 requestů za minutu na uživatele účtu)
+SHEETS_REQUESTS_PER_MINUTE = 60
+SHEETS_BACKGROUND_SHARE = 0.8  # práce na pozadí smí jen tuto část rozpočtu, zbytek je pro hráče
+SHEETS_TIMEOUT = 15            # s - timeout jednoho HTTP requestu
+SHEETS_MAX_RETRIES = 4         # opakování pro práci na pozadí (odesílání tipů, obnova cache)
+SHEETS_MAX_BACKOFF = 16        # s - maximální pauza mezi opakováními
+SHEETS_FOREGROUND_RETRIES = 2  # opakování pro request v překreslení stránky (čeká hráč)
+SHEETS_FOREGROUND_BUDGET = 8   # s - nejdelší čekání hráče na opakování (pak se chyba ukáže hned)
+SHEETS_BREAKER_FAILURES = 5    # chyb za sebou, po kterých se API přestane volat
+SHEETS_BREAKER_COOLDOWN = 30   # s - jak dlouho se po otevření jističe nevolá
+
 # --- GOOGLE SHEETS SLOUPCE ---
 # Indexy sloupců v Google Sheetu "Tipy" (gspread je 1-based)
 COL_TIP_DOMACI = 3
@@ -61,6 +116,17 @@ POINTS_CONFIG = {
     'underdog_bonus': 1
 }
 
+# Fáze a týmy zápasů (data/store.py - příznaky se určí jednou při načtení zápasů)
+PLAYOFF_KEYWORDS = ["playoff", "finále", "o 3.", "čtvrt", "semi"]   # playoff násobič bodů
+STATS_PLAYOFF_KEYWORDS = ["playoff", "finále", "o 3. místo"]        # playoff ve statistikách
+CZECH_TEAM_KEYWORDS = ["česko", "czech"]                            # bonus za české týmy
+
+# Projekce šancí na konečné pořadí (Monte Carlo, business/simulation.py)
+PROJECTION_SIMULATIONS = 20000   # simulací turnaje na jednu verzi výsledků
+PROJECTION_CHUNK = 500           # simulací v jedné úloze procesu (velikost polí hráči x zápasy x simulace)
+# Počet procesů simulace (0 = podle počtu jader)
+PROJECTION_WORKERS = int(os.environ.get("TIPOVACKA_PROJECTION_WORKERS", "0")) or None
+
 # --- HISTORICKÉ VÝSLEDKY (z originálu) ---
 HISTORY_HOCKEY = [
     {"Rok": 2025, "Turnaj": "MS - Švédsko/Dánsko", "🥇 1. Místo": "Brácha Tyrdy", "🥈 2. Místo": "Lukáš", "🥉 3. Místo": "Antonín"},
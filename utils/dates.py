@@ -0,0 +1,86 @@
+"""
+Parsování datumů z Google Sheets
+Formát sloupce se určí jednou podle první hodnoty, celý sloupec se pak převede
+jedním průchodem (pandas) včetně časové zóny. Stejné texty se parsují jen jednou.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+
+from utils.config import TIMEZONE
+
+# Podporované formáty (pořadí = priorita)
+DATE_FORMATS = ("%Y-%m-%d %H:%M", "%d.%m.%Y %H:%M", "%Y-%m-%d", "%d.%m.%Y")
+
+
+@lru_cache(maxsize=4096)
+def _parse_text(text: str):
+    for fmt in DATE_FORMATS:
+        try:
+            dt = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        # Přiřadíme timezone Praha
+        return TIMEZONE.localize(dt)
+    return None
+
+
+def parse_date(date_str):
+    """
+    Parse jednoho datumu (text z listu, konstanta z configu, hodnota z Nastavení).
+    Výsledek pro stejný text se pamatuje, opakované volání nic neparsuje.
+    PŮVODNÍ FUNKCE z tipovacka_12.py
+    """
+    if not date_str:
+        return None
+    if isinstance(date_str, datetime):
+        return date_str
+    return _parse_text(str(date_str))
+
+
+def detect_format(values):
+    """Vrátí formát první neprázdné textové hodnoty (nebo None)."""
+    for v in values:
+        if not v or isinstance(v, datetime):
+            continue
+        for fmt in DATE_FORMATS:
+            try:
+                datetime.strptime(str(v), fmt)
+                return fmt
+            except ValueError:
+                continue
+        return None
+    return None
+
+
+def parse_dates(values) -> list:
+    """
+    Hromadný parse celého sloupce (např. Zapasy.Datum).
+
+    Returns:
+        seznam datetime (s časovou zónou) nebo None, ve stejném pořadí
+    """
+    values = list(values)
+    texts = {str(v) for v in values if v and not isinstance(v, datetime)}
+
+    parsed = {}
+    fmt = detect_format(values)
+    if fmt and texts:
+        unique = pd.Series(sorted(texts), dtype=object)
+        stamps = pd.to_datetime(unique, format=fmt, errors='coerce')
+        stamps = stamps.dt.tz_localize(TIMEZONE, ambiguous='NaT', nonexistent='NaT')
+        parsed = {text: ts.to_pydatetime() for text, ts in zip(unique, stamps) if not pd.isna(ts)}
+
+    result = []
+    for v in values:
+        if not v:
+            result.append(None)
+        elif isinstance(v, datetime):
+            result.append(v)
+        else:
+            # Řádky v jiném formátu (nebo na přechodu času) po jednom
+            text = str(v)
+            result.append(parsed[text] if text in parsed else parse_date(text))
+    return result